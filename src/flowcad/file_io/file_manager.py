@@ -279,8 +279,11 @@ class FlowCADFileManager:
             # Charger les équipements
             self._load_equipment(project_data, canvas)
             
-            # Charger les tuyaux
-            self._load_pipes(project_data, canvas)
+            # Charger les tuyaux (les statuts des ports changent en masse :
+            # une seule mise à jour graphique à la fin)
+            from ..gui.graphics.equipment_graphics import PortGraphicsItem
+            with PortGraphicsItem.batch_update():
+                self._load_pipes(project_data, canvas)
             
             # Mettre à jour l'état
             self.current_file_path = file_path
@@ -387,6 +390,10 @@ class FlowCADFileManager:
     def _load_pipes(self, project_data: Dict, canvas) -> None:
         """Charge les tuyaux dans le canvas"""
         pipes_list = project_data["flowcad_project"].get("pipes", [])
+        from ..gui.graphics.polyline_graphics import PolylineGraphicsItem
+
+        # Polylignes chargées, enregistrées auprès des équipements en une fois à la fin
+        loaded_polylines = []
         
         for pipe_data in pipes_list:
             try:
@@ -412,13 +419,14 @@ class FlowCADFileManager:
                         end_port = eq_item.get_port(end_conn["port_id"])
                 
                 # Créer la polyligne
-                from ..gui.graphics.polyline_graphics import PolylineGraphicsItem
                 polyline = PolylineGraphicsItem(
                     points, 
                     start_port, 
                     end_port, 
-                    pipe_data["id"]
+                    pipe_data["id"],
+                    register=False
                 )
+                loaded_polylines.append(polyline)
                 
                 # Appliquer les propriétés
                 if "properties" in pipe_data:
@@ -439,6 +447,8 @@ class FlowCADFileManager:
                 
             except Exception as e:
                 print(f"❌ Erreur chargement tuyau {pipe_data.get('id', 'unknown')} : {e}")
+
+        PolylineGraphicsItem.bulk_register(loaded_polylines)
     
     # =============================================================================
     # UTILITAIRES
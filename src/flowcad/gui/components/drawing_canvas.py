@@ -143,6 +143,10 @@ class DrawingCanvas(QGraphicsView):
         
         # Activer le zoom avec la molette
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+
+        # Ne redessiner que les zones signalées (les équipements et polylignes les regroupent
+        # par tour de boucle, voir schedule_scene_update)
+        self.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate)
         
         # Anti-aliasing pour un rendu plus lisse
         #self.setRenderHint(self.renderHints() | self.renderHints().Antialiasing)
@@ -464,9 +468,8 @@ class DrawingCanvas(QGraphicsView):
         
         # Mettre à jour la polyligne de prévisualisation
         if self.current_polyline:
-            self.current_polyline.points = self.polyline_points.copy()
-            # Ajouter un point temporaire pour la suite
-            self.current_polyline.points.append(pos)
+            # Points existants plus un point temporaire pour la suite
+            self.current_polyline.points = self.polyline_points + [pos]
             self.current_polyline.update_path()
         
         print(f"📍 Point ajouté: ({pos.x():.1f}, {pos.y():.1f})")
@@ -478,12 +481,13 @@ class DrawingCanvas(QGraphicsView):
         if not self.current_polyline or not self.is_creating_polyline:
             return
         
-        # Copier les points existants
-        preview_points = self.polyline_points.copy()
-        preview_points.append(pos)
+        # Seul le point temporaire suit la souris : déplacé en place dans le chemin existant
+        if self.current_polyline.point_count() == len(self.polyline_points) + 1:
+            self.current_polyline.set_last_point(pos)
+            return
         
-        # Mettre à jour la polyligne de prévisualisation
-        self.current_polyline.points = preview_points
+        # Sinon reconstruire à partir des points existants
+        self.current_polyline.points = self.polyline_points + [pos]
         self.current_polyline.update_path()
 
     def finalize_polyline(self, end_port):
@@ -740,6 +744,7 @@ class DrawingCanvas(QGraphicsView):
             
             # Retirer de la scène
             self.scene.removeItem(equipment_item)
+            equipment_item.destroy()  # Déconnecte des signaux globaux
             
             # Retirer de notre dictionnaire
             del self.equipment_items[equipment_id]
@@ -1189,7 +1194,6 @@ class DrawingCanvas(QGraphicsView):
         new_state = not current_state
         
         PortGraphicsItem.set_show_connected_ports(new_state)
-        self.update_all_ports_visibility()
         
         status_msg = "Ports connectés affichés" if new_state else "Ports connectés cachés"
         print(f"👻 {status_msg}")
@@ -1198,25 +1202,14 @@ class DrawingCanvas(QGraphicsView):
     def set_connected_ports_visibility(self, visible: bool):
         """Définit l'affichage des ports connectés"""
         PortGraphicsItem.set_show_connected_ports(visible)
-        self.update_all_ports_visibility()
         
         status_msg = "affichés" if visible else "cachés"
         print(f"👻 Ports connectés {status_msg}")
 
     def update_all_ports_visibility(self):
         """Met à jour la visibilité de tous les ports existants"""
-        total_ports = 0
-        updated_ports = 0
-        
-        for equipment_item in self.equipment_items.values():
-            for port in equipment_item.get_all_ports():
-                total_ports += 1
-                old_visibility = port.isVisible()
-                port.update_visibility()
-                if old_visibility != port.isVisible():
-                    updated_ports += 1
-        
-        print(f"🔄 {updated_ports}/{total_ports} ports mis à jour")
+        # Le registre de PortGraphicsItem connaît déjà tous les ports vivants
+        PortGraphicsItem.update_all_ports_visibility()
 
     def show_all_ports_temporarily(self, duration_ms: int = 3000):
         """Affiche temporairement tous les ports (pour debug/édition)"""
@@ -6,40 +6,292 @@ Classes graphiques pour représenter les équipements hydrauliques sur le canvas
 """
 
 from logging import root
-from PyQt5.QtWidgets import QGraphicsItem, QGraphicsTextItem, QGraphicsEllipseItem
-from PyQt5.QtCore import Qt, QRectF, pyqtSignal, QObject, QByteArray, QPointF
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsTextItem, QGraphicsEllipseItem, QGraphicsView
+from PyQt5.QtCore import Qt, QRectF, pyqtSignal, QObject, QByteArray, QPointF, QTimer
 from PyQt5.QtGui import QColor, QBrush, QPen, QPainter, QTransform
 from PyQt5.QtSvg import QGraphicsSvgItem, QSvgRenderer 
 import os
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 from enum import Enum
+from functools import cache, lru_cache
 from typing import Dict, List, Optional
 
 import re
-import xml.etree.ElementTree as ET
+try:
+    # lxml (optionnel) : analyse et sérialisation en C, même API que ElementTree pour ce qui est utilisé ici
+    from lxml import etree as ET
 
+    # Éléments portant un id, trouvés par libxml2 (requête compilée une seule fois)
+    _ID_XPATH = ET.XPath('descendant-or-self::*[@id]')
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _ID_XPATH = None
+
+import numpy as np
 from numpy import cos, sin, radians
 
-from .pipe_style_manager import pipe_style_manager
+from .pipe_style_manager import pipe_style_manager, scaled_stroke_width
+
+# Traces de debug des styles SVG (désactivées : émises pour chaque port masqué, chaque changement
+# d'état ou d'échelle de chaque équipement)
+DEBUG = False
 
 #from .polyline_graphics import PolylineGraphicsItem
+# Classe PolylineGraphicsItem, importée au premier appel de update_connected_polylines
+# (polyline_graphics importe ce module : pas d'import au chargement)
+_PolylineGraphicsItem = None
 
 # =============================================================================
 # ÉNUMÉRATION POUR L'ÉTAT DES PORTS
 # =============================================================================
 
-class PortVisualState(Enum):
+class _IndexedEnum(Enum):
+    """Énumération dont chaque membre porte, en plus de sa valeur, un petit indice entier"""
+
+    def __new__(cls, index: int, value: str):
+        member = object.__new__(cls)
+        member._value_ = value  # la valeur reste la chaîne (sauvegardée dans les projets)
+        member.index = index    # petit entier pour indexer les tables de rendu
+        return member
+
+    # Les membres sont des singletons : hachage par identité (slot C) au lieu de Enum.__hash__
+    __hash__ = object.__hash__
+
+class PortVisualState(_IndexedEnum):
     """États possibles d'un port hydraulique"""
-    NORMAL = "normal"                # Apparence normale
-    HIGHLIGHTED = "highlighted"      # Port en surbrillance (hover)
-    SELECTED = "selected"           # Port sélectionné
-    PREVIEW = "preview"           # Port en mode preview (ex: lors de la création de polyligne)
+    NORMAL = (0, "normal")                # Apparence normale
+    HIGHLIGHTED = (1, "highlighted")      # Port en surbrillance (hover)
+    SELECTED = (2, "selected")           # Port sélectionné
+    PREVIEW = (3, "preview")           # Port en mode preview (ex: lors de la création de polyligne)
 
-class PortConnectionStatus(Enum):
+class PortConnectionStatus(_IndexedEnum):
     """États possibles d'une connexion entre ports"""
-    DISCONNECTED = "disconnected"    # Pas de connexion
-    CONNECTED = "connected"          # Connexion établie
-    PENDING = "pending"              # Connexion en attente
-    RESERVED = "reserved"            # Connexion réservée
+    DISCONNECTED = (0, "disconnected")    # Pas de connexion
+    CONNECTED = (1, "connected")          # Connexion établie
+    PENDING = (2, "pending")              # Connexion en attente
+    RESERVED = (3, "reserved")            # Connexion réservée
+
+# Couleurs partagées : chaque code hexadécimal n'est analysé qu'une fois
+# (les QColor renvoyées sont partagées, ne pas les modifier)
+@lru_cache(maxsize=64)
+def _qcolor(hex_str: str) -> QColor:
+    return QColor(hex_str)
+
+# =============================================================================
+# LECTURE DES SVG (mise en cache : plusieurs équipements partagent le même fichier)
+# =============================================================================
+
+# Les fichiers SVG des équipements ne changent pas pendant une session : un seul accès disque
+# par chemin (vider avec _svg_exists.cache_clear() si la bibliothèque est rechargée)
+@lru_cache(maxsize=None)
+def _svg_exists(svg_path: str) -> bool:
+    return os.path.isfile(svg_path)
+
+# Identifiant des ports dessinés dans les SVG (ex: "Port1"), compilé une fois
+_PORT_ID_RE = re.compile(r'Port(\d+)', re.IGNORECASE)
+
+@lru_cache(maxsize=128)
+def _read_svg_geometry(svg_path: str):
+    """
+    Lit un SVG et renvoie (width, height, vb_width, vb_height, ports)
+
+    ports est un tuple trié de (numéro, x, y), x et y étant exprimés dans les dimensions du SVG.
+    """
+    root = None
+
+    # Numéros et coordonnées brutes (repère viewBox) des ports trouvés
+    numbers, cx_values, cy_values = [], [], []
+
+    # Lecture en flux : chaque élément est libéré dès qu'il a été examiné, l'arbre complet
+    # n'est jamais gardé en mémoire (le fichier est ouvert en binaire par le parseur)
+    for event, element in ET.iterparse(svg_path, events=('start', 'end')):
+        if root is None:
+            # Premier évènement : ouverture de la racine <svg>, ses attributs sont déjà disponibles
+            root = element
+
+            # Extraire les dimensions du SVG
+            width = float(root.get('width'))
+            height = float(root.get('height'))
+            viewBox = root.get('viewBox')
+            min_x, min_y, vb_width, vb_height = map(float, viewBox.split())
+            continue
+
+        if event == 'start':
+            continue
+
+        # Chercher tous les éléments avec un attribut id
+        element_id = element.get('id')
+        if element_id:
+            # Vérifier si l'id contient "Port" suivi d'un nombre
+            match = _PORT_ID_RE.search(element_id)
+
+            if match:
+                numero_port = int(match.group(1))
+
+                # Extraire les coordonnées cx et cy
+                cx = element.get('cx')
+                cy = element.get('cy')
+
+                if cx is not None and cy is not None:
+                    numbers.append(numero_port)
+                    cx_values.append(cx)
+                    cy_values.append(cy)
+
+        # Élément traité (ses enfants l'ont été avant lui) : libérer son contenu
+        element.clear()
+
+    # Conversion viewBox → dimensions du SVG en une seule opération par axe
+    xs = np.asarray(cx_values, dtype=np.float64) * (width / vb_width)
+    ys = np.asarray(cy_values, dtype=np.float64) * (height / vb_height)
+
+    #trier les ports par numéro (tri stable, comme list.sort)
+    numbers = np.asarray(numbers, dtype=np.int64)
+    order = np.argsort(numbers, kind='stable')
+    ports = tuple(zip(numbers[order].tolist(), xs[order].tolist(), ys[order].tolist()))
+
+    return width, height, vb_width, vb_height, ports
+
+# Styles de tuyaux mis à l'échelle : fonctions pures de (état, échelle), mémorisées.
+# Le cache est vidé quand les styles globaux changent (connexion faite avant celle des équipements,
+# donc avant qu'ils ne se redessinent).
+@lru_cache(maxsize=256)
+def _cached_scaled_style(state: str, scale_rounded: float) -> tuple:
+    """Style des tuyaux mis à l'échelle, en tuple de paires (non modifiable, sert de clé)"""
+    return tuple(pipe_style_manager.get_scaled_pipe_style(state, scale_rounded).items())
+
+@lru_cache(maxsize=256)
+def _cached_stroke_width(base_width: float, scale_rounded: float) -> float:
+    """Épaisseur effective d'un trait (règle de pipe_style_manager.scaled_stroke_width), mémorisée"""
+    return scaled_stroke_width(base_width, scale_rounded)
+
+pipe_style_manager.styles_changed.connect(_cached_scaled_style.cache_clear)
+
+#Cache les ports svg. Des ports sont ajoutés sur Inkskape pour visualiser les connexions. IDéalement, ces ports ne
+#sont pas visible sur le dessin, mais remplacés par les ports FlowCAD
+def _elements_with_id(root: ET.Element):
+    """Éléments candidats d'une recherche par id : ceux qui en portent un (arbre lxml), sinon tous"""
+    if _ID_XPATH is not None and hasattr(root, 'xpath'):
+        return _ID_XPATH(root)
+    return root.iter()
+
+def _build_id_index(root: ET.Element) -> Dict[str, ET.Element]:
+    """Éléments d'un arbre SVG par id, en un seul parcours (les recherches par id deviennent directes)"""
+    return {element.get('id'): element for element in _elements_with_id(root) if element.get('id')}
+
+def _scan_svg_tree(root: ET.Element):
+    """
+    Parcours unique d'un arbre SVG : éléments par id (voir _build_id_index) et éléments Pipexxx,
+    dans l'ordre du document (même règle que PipeStyleManager.find_pipe_elements : id commençant
+    par "pipe", casse ignorée). Retourne (id_index, pipe_elements).
+    """
+    id_index = {}
+    pipe_elements = []
+    for element in _elements_with_id(root):
+        element_id = element.get('id')
+        if element_id:
+            id_index[element_id] = element
+            if element_id[:4].lower() == 'pipe':
+                pipe_elements.append(element)
+    return id_index, pipe_elements
+
+def _hide_ports_in_tree(root: ET.Element, id_index: Optional[Dict[str, ET.Element]] = None):
+    """
+    Masque les ports dessinés dans un arbre SVG déjà analysé (modification en place) ;
+    id_index (voir _build_id_index) évite de reparcourir l'arbre s'il est déjà construit
+    """
+    if id_index is None:
+        id_index = _build_id_index(root)
+    for element_id, element in id_index.items():
+        if _PORT_ID_RE.search(element_id):
+            element.set('style', 'opacity:0')
+            if DEBUG:
+                print(f"⚠️ Port masqué: {element_id}")
+
+@lru_cache(maxsize=64)
+def _parsed_equipment_svg(svg_path: str):
+    """
+    Arbre SVG d'un équipement gardé en mémoire : analysé une seule fois par chemin, ports déjà
+    masqués, éléments Pipexxx repérés. Retourne (racine, éléments Pipe, SVG de base) ou None
+    si illisible ; le SVG de base (UTF-8, ports masqués, styles d'origine) est sérialisé une fois.
+    Les styles sont réécrits à chaque construction (voir _build_equipment_svg).
+    """
+    try:
+        with open(svg_path, 'rb') as f:
+            root = ET.fromstring(f.read())
+    except (OSError, ET.ParseError) as e:
+        print(f"❌ Erreur lecture SVG {svg_path}: {e}")
+        return None
+
+    # Éléments par id et éléments Pipe, en un seul parcours de l'arbre
+    id_index, pipe_elements = _scan_svg_tree(root)
+
+    #cacher les ports pour qu'ils ne soient pas visibles
+    _hide_ports_in_tree(root, id_index)
+
+    return root, tuple(pipe_elements), ET.tostring(root, encoding='utf-8')
+
+# Un nouvel attribut de style ne doit pas rester sur les arbres déjà stylés
+pipe_style_manager.styles_changed.connect(_parsed_equipment_svg.cache_clear)
+
+@lru_cache(maxsize=64)
+def _build_equipment_svg(svg_path: str, pipe_style: tuple) -> bytes:
+    """
+    Construit le SVG final d'un équipement sans relire ni analyser le fichier : les styles des
+    tuyaux sont réécrits directement dans le SVG de base (texte), ou, si une balise Pipe n'y est
+    pas reconnue, appliqués sur l'arbre résident qui est alors resérialisé en UTF-8
+
+    pipe_style est le style des tuyaux déjà mis à l'échelle, en tuple de paires (clé du cache :
+    un changement de style global donne une autre clé). Renvoie b"" si le SVG est illisible.
+    """
+    parsed = _parsed_equipment_svg(svg_path)
+    if parsed is None:
+        return b""
+    root, pipe_elements, base_svg = parsed
+    if not pipe_elements:
+        return base_svg
+
+    # Chemin rapide : attributs des balises Pipe remplacés dans le texte, sans sérialisation
+    modified = pipe_style_manager.rewrite_pipe_styles(base_svg, pipe_style, len(pipe_elements))
+    if modified is not None:
+        return modified
+
+    # Styles des tuyaux internes (éléments Pipexxx)
+    style = dict(pipe_style)
+    for element in pipe_elements:
+        pipe_style_manager.apply_style_to_element(element, style)
+
+    return ET.tostring(root, encoding='utf-8')
+
+# Zones de scène à redessiner, réunies par scène jusqu'au prochain tour de boucle Qt.
+# Partagé par les équipements et les polylignes : un déplacement ne provoque qu'un rafraîchissement.
+_pending_scene_rects = {}
+
+def schedule_scene_update(scene, rect: QRectF):
+    """Ajoute une zone à redessiner ; la scène est mise à jour une seule fois, au prochain tour de boucle"""
+    if scene is None:
+        return
+    if not _pending_scene_rects:
+        QTimer.singleShot(0, _flush_scene_updates)
+    pending = _pending_scene_rects.get(scene)
+    _pending_scene_rects[scene] = QRectF(rect) if pending is None else pending.united(rect)
+
+def _flush_scene_updates():
+    """Redessine en une fois les zones accumulées par schedule_scene_update"""
+    pending = dict(_pending_scene_rects)
+    _pending_scene_rects.clear()
+    for scene, rect in pending.items():
+        scene.update(rect)
+
+# Règles de visibilité d'un port (8 combinaisons possibles, mémorisées) :
+# 1. Si force_visible = True → toujours visible
+# 2. Si SHOW_CONNECTED_PORTS = True → toujours visible
+# 3. Si port connecté et SHOW_CONNECTED_PORTS = False → invisible
+# 4. Sinon → visible
+@cache
+def _port_visible(force: bool, show_all: bool, status_is_connected: bool) -> bool:
+    return force or show_all or not status_is_connected
 
 # =============================================================================
 # CLASSE POUR UN PORT GRAPHIQUE
@@ -70,19 +322,54 @@ class PortGraphicsItem(QGraphicsEllipseItem):
 
     }
 
+    # Couleur des combinaisons absentes de PORT_COLORS (ex: port en attente)
+    DEFAULT_PORT_COLOR = "#CCCCCC"
+
+    # Pinceaux précalculés, indexés par status.index * 8 + visual_state.index
+    _BRUSH_TABLE = [None] * 32
+    # Fonctions d'application (pinceau + contour) précalculées, même indexation
+    _APPLIERS = [None] * 32
+    _cache_ready = False
+
+    # Emoji du tooltip selon le statut
+    STATUS_EMOJI = {
+        PortConnectionStatus.DISCONNECTED: "🔴",
+        PortConnectionStatus.CONNECTED: "🟢", 
+        PortConnectionStatus.PENDING: "🟡",
+        PortConnectionStatus.RESERVED: "🟠"
+    }
+
     # Variable de contrôle pour l'affichage des ports connectés
     SHOW_CONNECTED_PORTS = False  # Par défaut, cacher les ports connectés
+
+    # Registre des ports vivants (références faibles : un port détruit disparaît tout seul)
+    _instances = weakref.WeakSet()
+
+    # Au-delà de ce nombre de ports, les mises à jour globales redessinent toute la vue
+    # d'un coup plutôt que de calculer les zones sales port par port
+    FULL_VIEWPORT_THRESHOLD = 200
+
+    # Mise à jour groupée (voir batch_update) : ports à rafraîchir en sortie de lot
+    _batching = False
+    _dirty = set()
     
     def __init__(self, port_id: str, parent_equipment=None):
         # Cercle de rayon 12 pixels centré sur l'origine
         super().__init__(-6, -6, 12, 12)
 
+        type(self)._instances.add(self)
+
         self.port_id = port_id
         self.parent_equipment = parent_equipment
         self.connection_status = PortConnectionStatus.DISCONNECTED  #etat logique du port
         self.visual_state = PortVisualState.NORMAL          #etat visuel du port
 
         self.force_visible = False  # Pour forcer l'affichage même si connecté
+        self._last_vis_key = None   # Entrées de la dernière mise à jour de visibilité
+        self._canvas_ref = None     # Référence faible vers le canvas (résolue au premier clic)
+        self._polyline_cb = None    # Référence faible vers canvas.handle_port_click_for_polyline
+        self._py_visible = True     # Miroir Python de la visibilité Qt (tenu à jour par itemChange)
+        self._last_applier = None   # Dernier style appliqué (voir update_appearance)
 
         self.setAcceptHoverEvents(True)
         
@@ -94,105 +381,139 @@ class PortGraphicsItem(QGraphicsEllipseItem):
         self.setZValue(2)
         
         # Style initial
+        self._ensure_cache()
         self.update_appearance()
         #pour la visibilité du port
         self.update_visibility()
         
-        # Tooltip informatif
-        self.setToolTip(f"Port: {port_id}\nStatut: {self.connection_status.value}")
+        # Tooltip informatif : textes précalculés, appliqué à la demande (voir hoverEnterEvent)
+        self._prepare_tooltips()
 
     def update_appearance(self):
         """Met à jour l'apparence selon l'état du port"""
+        if self._batching:
+            self._dirty.add(self)
+            return
 
-        #couleur selon combinaison d'état visuel et de status
-        color_key = (self.connection_status, self.visual_state)
-        color = QColor(self.PORT_COLORS[color_key])
+        # Remplissage et contour selon la combinaison status / état visuel
+        applier = self._APPLIERS[self.connection_status.index * 8 + self.visual_state.index]
+        if applier is self._last_applier:
+            return  # Même couleur et même contour qu'actuellement : rien à redessiner
+        self._last_applier = applier
+        applier(self)
 
-        # Couleur par défaut si combinaison non trouvée
-        default_color = "#CCCCCC"
-        color_hex = self.PORT_COLORS.get(color_key, default_color)
-        color = QColor(color_hex)
-        
-        # Remplissage
-        self.setBrush(QBrush(color))
-        
+    @classmethod
+    def _ensure_cache(cls):
+        """Construit une seule fois les tables de pinceaux et d'application à partir de PORT_COLORS"""
+        if cls._cache_ready:
+            return
         # Contour plus épais si sélectionné
-        pen_width = 3 if self.visual_state == PortVisualState.SELECTED else 2
-        self.setPen(QPen(Qt.black, pen_width))
+        normal_pen = QPen(Qt.black, 2)
+        selected_pen = QPen(Qt.black, 3)
+
+        # Une seule brosse par couleur et une seule fonction par (couleur, contour) : deux
+        # combinaisons au rendu identique partagent le même objet (comparaison par identité)
+        brushes = {}
+        appliers = {}
+
+        # Toutes les combinaisons sont remplies : la couleur par défaut n'est résolue qu'ici
+        for status in PortConnectionStatus:
+            for visual_state in PortVisualState:
+                index = status.index * 8 + visual_state.index
+                color_hex = cls.PORT_COLORS.get((status, visual_state), cls.DEFAULT_PORT_COLOR)
+                if color_hex not in brushes:
+                    brushes[color_hex] = QBrush(_qcolor(color_hex))
+                brush = cls._BRUSH_TABLE[index] = brushes[color_hex]
+
+                selected = visual_state is PortVisualState.SELECTED
+                pen = selected_pen if selected else normal_pen
+                key = (color_hex, selected)
+                if key not in appliers:
+                    appliers[key] = lambda item, b=brush, p=pen: (item.setBrush(b), item.setPen(p))
+                cls._APPLIERS[index] = appliers[key]
+        cls._cache_ready = True
 
     #méthodes pour gérer l'état logique (connecté/déconnecté)
 
     def update_tooltip(self):
-        """Met à jour le tooltip avec les informations actuelles du port"""
-        # Emoji selon le statut
-        status_emoji = {
-            PortConnectionStatus.DISCONNECTED: "🔴",
-            PortConnectionStatus.CONNECTED: "🟢", 
-            PortConnectionStatus.PENDING: "🟡",
-            PortConnectionStatus.RESERVED: "🟠"
-        }
-        
-        emoji = status_emoji.get(self.connection_status, "⚪")
-        tooltip_text = f"{emoji} Port: {self.port_id}\nStatut: {self.connection_status.value}"
-        
-        # Ajouter des infos supplémentaires si connecté
-        if self.connection_status == PortConnectionStatus.CONNECTED:
-            tooltip_text += "\n💧 Connecté"
-        elif self.connection_status == PortConnectionStatus.DISCONNECTED:
-            tooltip_text += "\n🔓 Libre"
-            
-        # Ajouter info de visibilité si connecté
-        if self.connection_status == PortConnectionStatus.CONNECTED:
-            if not self.isVisible():
-                tooltip_text += "\n👻 (Caché car connecté)"
-            else:
-                tooltip_text += "\n💧 Connecté"
-        elif self.connection_status == PortConnectionStatus.DISCONNECTED:
-            tooltip_text += "\n🔓 Libre"
-            
-        self.setToolTip(tooltip_text)
+        """
+        Marque le tooltip à reconstruire : il l'est au prochain survol du port, ou tout de suite
+        si la souris est déjà dessus (clic en mode polyligne qui connecte le port, par exemple)
+        """
+        self._tooltip_dirty = True
+        if self.isUnderMouse():
+            self._rebuild_tooltip()
+
+    def _rebuild_tooltip(self):
+        """Reconstruit le tooltip avec les informations actuelles du port"""
+        self._tooltip_dirty = False
+
+        # Un port connecté caché l'indique dans son tooltip
+        if self.connection_status is PortConnectionStatus.CONNECTED and not self._py_visible:
+            self.setToolTip(self._tooltip_hidden)
+        else:
+            self.setToolTip(self._tooltip_visible)
+
+    def _prepare_tooltips(self):
+        """Précalcule les textes de tooltip pour le statut courant (visible / caché)"""
+        emoji = self.STATUS_EMOJI.get(self.connection_status, "⚪")
+        header = f"{emoji} Port: {self.port_id}\nStatut: {self.connection_status.value}"
+
+        # Ajouter des infos supplémentaires selon le statut
+        if self.connection_status is PortConnectionStatus.CONNECTED:
+            self._tooltip_visible = header + "\n💧 Connecté"
+            self._tooltip_hidden = header + "\n👻 (Caché car connecté)"
+        elif self.connection_status is PortConnectionStatus.DISCONNECTED:
+            self._tooltip_visible = self._tooltip_hidden = header + "\n🔓 Libre"
+        else:
+            self._tooltip_visible = self._tooltip_hidden = header
+        self.update_tooltip()
 
     def set_connection_status(self, status: PortConnectionStatus):
         """Change l'état du port"""
         print(f"Changement d'état du port {self.port_id} : {self.connection_status} -> {status}")
-        if self.connection_status != status:
+        if self.connection_status is not status:
             self.connection_status = status
             self.update_appearance()    # Met à jour l'apparence du port
-            self.update_tooltip()       # Met à jour le tooltip du port
+            self._prepare_tooltips()    # Met à jour le tooltip du port
             self.update_visibility()    # Met à jour la visibilité du port
 
     def is_free(self) -> bool:
         """vérifie si le port est libre"""
-        return self.connection_status == PortConnectionStatus.DISCONNECTED
+        return self.connection_status is PortConnectionStatus.DISCONNECTED
 
     def is_connected(self) -> bool:
         """vérifie si le port est connecté"""
-        return self.connection_status == PortConnectionStatus.CONNECTED
+        return self.connection_status is PortConnectionStatus.CONNECTED
     
     def can_connect(self) -> bool:
         """Vérifie si on peut connecter ce port"""
-        return self.connection_status in [PortConnectionStatus.DISCONNECTED]
+        return self.connection_status is PortConnectionStatus.DISCONNECTED
 
     #méthodes pour gérer l'état visuel----------------------------------
 
     # Met à jour la visibilité du port selon son statut de connexion
     def update_visibility(self):
         """Met à jour la visibilité du port selon son statut de connexion"""
+        if self._batching:
+            self._dirty.add(self)
+            return
         
-        # Règles de visibilité :
-        # 1. Si force_visible = True → toujours visible
-        # 2. Si SHOW_CONNECTED_PORTS = True → toujours visible  
-        # 3. Si port connecté et SHOW_CONNECTED_PORTS = False → invisible
-        # 4. Sinon → visible
+        # Rien n'a changé depuis le dernier calcul → rien à faire
+        key = (self.force_visible, PortGraphicsItem.SHOW_CONNECTED_PORTS, self.connection_status)
+        if key == self._last_vis_key:
+            return
+        self._last_vis_key = key
         
-        should_be_visible = (
-            self.force_visible or 
-            PortGraphicsItem.SHOW_CONNECTED_PORTS or 
-            self.connection_status != PortConnectionStatus.CONNECTED
+        should_be_visible = _port_visible(
+            self.force_visible,
+            PortGraphicsItem.SHOW_CONNECTED_PORTS,
+            self.connection_status is PortConnectionStatus.CONNECTED
         )
         
-        if should_be_visible != self.isVisible():
+        if should_be_visible != self._py_visible:
             self.setVisible(should_be_visible)
+            self.update_tooltip()  # Le tooltip mentionne la visibilité
             print(f"👻 Port {self.port_id} {'visible' if should_be_visible else 'invisible'}")
 
     def set_force_visible(self, visible: bool):
@@ -204,16 +525,15 @@ class PortGraphicsItem(QGraphicsEllipseItem):
 
     def set_visual_state(self, state: PortVisualState):
         """Change l'état visuel du port"""
-        if self.visual_state != state:
+        if self.visual_state is not state:
             self.visual_state = state
-            self.update_appearance()
-            self.update_tooltip()
+            self.update_appearance()    # Le tooltip ne dépend pas de l'état visuel
 
     def highlight(self, enable=True):
         """Met en surbrillance ou retire la surbrillance"""
-        if enable and self.visual_state == PortVisualState.NORMAL:
+        if enable and self.visual_state is PortVisualState.NORMAL:
             self.set_visual_state(PortVisualState.HIGHLIGHTED)
-        elif not enable and self.visual_state == PortVisualState.HIGHLIGHTED:
+        elif not enable and self.visual_state is PortVisualState.HIGHLIGHTED:
             self.set_visual_state(PortVisualState.NORMAL)
 
     def select(self, enable=True):
@@ -229,30 +549,18 @@ class PortGraphicsItem(QGraphicsEllipseItem):
         """Gestion du clic sur le port"""
         if event.button() == Qt.LeftButton:
             
-            # Récupérer le canvas parent
-            canvas = None
-            if self.scene() and hasattr(self.scene(), 'views'):
-                views = self.scene().views()
-                if views:
-                    canvas = views[0]
-
-            print(f"🔍 DEBUG: Clic sur port {self.port_id}")
-            print(f"🔍 Canvas trouvé: {canvas is not None}")
-            print(f"🔍 Mode interaction: {getattr(canvas, 'interaction_mode', 'NONE')}")
-            
-            # Vérifier le mode d'interaction
-            print(f"Mode d'interaction: {canvas.interaction_mode}")
-            if canvas and hasattr(canvas, 'interaction_mode'):
-                if canvas.interaction_mode == "create_polyline":
-                    # Mode création de polyligne
-                    self.handle_polyline_click(canvas)
-                    event.accept()
-                    return
+            # Récupérer le canvas parent et vérifier le mode d'interaction
+            canvas = self._get_canvas()
+            if getattr(canvas, 'interaction_mode', None) == "create_polyline":
+                # Mode création de polyligne
+                self.handle_polyline_click(canvas)
+                event.accept()
+                return
 
             print(f"Port cliqué: {self.port_id} de l'équipement {self.parent_equipment.equipment_id if self.parent_equipment else 'N/A'}")
 
             # Changer l'état pour montrer la sélection
-            if self.visual_state != PortVisualState.SELECTED:
+            if self.visual_state is not PortVisualState.SELECTED:
                 self.set_visual_state(PortVisualState.SELECTED)
             else:
                 self.set_visual_state(PortVisualState.NORMAL)
@@ -262,15 +570,43 @@ class PortGraphicsItem(QGraphicsEllipseItem):
         else:
             super().mousePressEvent(event)
     
+    def _get_canvas(self):
+        """Retourne le canvas (première vue de la scène), mis en cache par référence faible"""
+        canvas = self._canvas_ref() if self._canvas_ref is not None else None
+        if canvas is None:
+            scene = self.scene()
+            views = scene.views() if scene is not None else []
+            if views:
+                canvas = views[0]
+                self._canvas_ref = weakref.ref(canvas)
+                # Méthode de gestion des clics en mode polyligne, résolue une seule fois
+                callback = getattr(canvas, 'handle_port_click_for_polyline', None)
+                self._polyline_cb = weakref.WeakMethod(callback) if callback is not None else None
+        return canvas
+
+    def itemChange(self, change, value):
+        """Réagit aux changements d'état du port"""
+        if change == QGraphicsItem.ItemSceneHasChanged:
+            # Nouvelle scène → le canvas sera résolu à nouveau au prochain clic
+            self._canvas_ref = None
+            self._polyline_cb = None
+        elif change == QGraphicsItem.ItemVisibleHasChanged:
+            self._py_visible = bool(value)
+        return super().itemChange(change, value)
+    
     def hoverEnterEvent(self, event):
         """Survol du port"""
-        if self.visual_state == PortVisualState.NORMAL:
+        if self.visual_state is PortVisualState.NORMAL:
             self.set_visual_state(PortVisualState.HIGHLIGHTED)
+        # Qt lit directement toolTip() lors de l'affichage : on le prépare au survol,
+        # seul moment où il peut être demandé
+        if self._tooltip_dirty:
+            self._rebuild_tooltip()
         super().hoverEnterEvent(event)
     
     def hoverLeaveEvent(self, event):
         """Fin de survol du port"""
-        if self.visual_state == PortVisualState.HIGHLIGHTED:
+        if self.visual_state is PortVisualState.HIGHLIGHTED:
             self.set_visual_state(PortVisualState.NORMAL)
         super().hoverLeaveEvent(event)
 
@@ -283,9 +619,13 @@ class PortGraphicsItem(QGraphicsEllipseItem):
             print(f"❌ Port {self.port_id} ne peut pas être connecté (statut: {self.connection_status.value})")
             return
         
-        # Appeler la méthode du canvas pour gérer la polyligne
-        if hasattr(canvas, 'handle_port_click_for_polyline'):
-            canvas.handle_port_click_for_polyline(self)
+        # Appeler la méthode du canvas pour gérer la polyligne (mise en cache par _get_canvas,
+        # sinon résolue sur le canvas reçu)
+        callback = self._polyline_cb() if self._polyline_cb is not None else None
+        if callback is None and canvas is not None:
+            callback = getattr(canvas, 'handle_port_click_for_polyline', None)
+        if callback is not None:
+            callback(self)
 
     # ✅ MÉTHODES DE CLASSE pour contrôler l'affichage global
     @classmethod
@@ -296,14 +636,67 @@ class PortGraphicsItem(QGraphicsEllipseItem):
             print(f"🌍 Affichage global des ports connectés: {'ON' if show else 'OFF'}")
             
             # Notifier tous les ports existants de mettre à jour leur visibilité
-            # (nécessite une référence aux ports existants)
             cls.update_all_ports_visibility()
 
     @classmethod  
     def update_all_ports_visibility(cls):
-        """Met à jour la visibilité de tous les ports existants"""
-        # Cette méthode sera appelée depuis le canvas qui a la liste des équipements
-        print("🔄 Mise à jour de la visibilité de tous les ports...")
+        """Met à jour la visibilité de tous les ports existants (registre des ports vivants)"""
+        ports = list(cls._instances)
+        with cls.batch_update():
+            for port in ports:
+                port.update_visibility()
+
+        print(f"🔄 Visibilité mise à jour pour {len(ports)} ports")
+
+    @classmethod
+    @contextmanager
+    def batch_update(cls):
+        """
+        Regroupe les mises à jour des ports (chargement de projet, affichage global...)
+
+        Pendant le bloc, les ports modifiés sont seulement notés. En sortie, chacun est
+        mis à jour une seule fois et la scène est redessinée en un seul passage.
+        """
+        if cls._batching:
+            # Lot déjà ouvert : c'est lui qui appliquera les changements
+            yield
+            return
+
+        ports = list(cls._instances)
+        scenes = {port.scene() for port in ports} - {None}
+
+        # Beaucoup de petits ports qui changent en même temps : Qt passe plus de temps à
+        # calculer les rectangles sales qu'à tout redessiner → FullViewportUpdate le temps du lot
+        saved_modes = []
+        if len(ports) > cls.FULL_VIEWPORT_THRESHOLD:
+            for scene in scenes:
+                for view in scene.views():
+                    saved_modes.append((view, view.viewportUpdateMode()))
+                    view.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+
+        for scene in scenes:
+            scene.blockSignals(True)
+        cls._batching = True
+        try:
+            yield
+        finally:
+            cls._batching = False
+            dirty, cls._dirty = cls._dirty, set()
+
+            # La visibilité d'abord : le tooltip en dépend
+            for port in dirty:
+                port.update_visibility()
+                port.update_appearance()
+                port.update_tooltip()
+
+            for scene in scenes:
+                scene.blockSignals(False)
+            for scene in scenes | ({port.scene() for port in dirty} - {None}):
+                scene.update()
+
+            # Restaurer le mode de mise à jour d'origine
+            for view, mode in saved_modes:
+                view.setViewportUpdateMode(mode)
 
     @classmethod
     def get_show_connected_ports(cls):
@@ -320,6 +713,31 @@ class EquipmentGraphicsItem(QGraphicsItem):
     # L'échelle est définie globalement
     EQUIPEMENT_SCALE = 2
 
+    # Renderers SVG partagés entre équipements, indexés par le contenu SVG final (LRU)
+    RENDERER_CACHE_SIZE = 32
+    _renderer_cache = OrderedDict()
+    # Tous les renderers encore utilisés par un item (même sortis de la LRU) : un contenu donné
+    # n'a jamais qu'un seul renderer vivant, libéré quand plus aucun item ne s'en sert
+    _renderer_intern = weakref.WeakValueDictionary()
+
+    # Équipements vivants, prévenus des changements de styles globaux (voir _dispatch_pipe_styles_changed)
+    _instances = weakref.WeakSet()
+    _styles_signal_connected = False
+    # Relais déjà programmé pour ce tour de boucle (plusieurs changements de styles → un seul redessin)
+    _styles_update_pending = False
+
+    # Matrices miroir + rotation déjà calculées, par (rotation_angle, mirror_h, mirror_v)
+    _TRANSFORM_TABLE = {}
+
+    # Contour et texte du rectangle de remplacement (équipement sans SVG)
+    FALLBACK_BORDER_PEN = QPen(Qt.black, 2)
+    FALLBACK_TEXT_PEN = QPen(Qt.white)
+
+    # Style des poignées de sélection
+    HANDLE_PEN = QPen(QColor(0, 120, 255), 1)
+    HANDLE_BRUSH = QBrush(Qt.white)
+
+
     def __init__(self, equipment_id: str, equipment_def: dict, svg_path: str = None, equipment_type: str = "generic"):
         super().__init__()
         
@@ -343,7 +761,14 @@ class EquipmentGraphicsItem(QGraphicsItem):
         # Composants graphiques
         self.svg_item: Optional[QGraphicsSvgItem] = None # Élément SVG de l'équipement
         self.ports: Dict[str, PortGraphicsItem] = {}    # Ports de l'équipement
+        self._ports_list: List[PortGraphicsItem] = []   # Mêmes ports, en liste (parcours fréquents)
+        self._port_bbox: Optional[tuple] = None         # Enveloppe des ports (xmin, ymin, xmax, ymax)
         self.ports_infos: List = [] # Informations sur les ports extraites du SVG
+        self._cached_bounding_rect: Optional[QRectF] = None  # Calculé à la demande (voir boundingRect)
+        self._last_scene_rect: Optional[QRectF] = None       # Zone de scène au dernier déplacement
+        self._svg_style_key: Optional[tuple] = None          # Style de tuyaux du SVG affiché
+        self._handle_rects: Optional[List[QRectF]] = None    # Poignées de sélection précalculées
+        self._handle_source_rect: Optional[QRectF] = None
         
         # Rendre l'équipement déplaçable et sélectionnable
         self.setFlag(QGraphicsItem.ItemIsMovable, True)
@@ -356,25 +781,30 @@ class EquipmentGraphicsItem(QGraphicsItem):
         # Activer la détection de survol
         self.setAcceptHoverEvents(True)
 
-        # Connecter aux changements de styles
-        pipe_style_manager.styles_changed.connect(self.on_pipe_styles_changed)
+        # S'inscrire aux changements de styles (une seule connexion pour tous les équipements)
+        type(self)._instances.add(self)
+        type(self)._connect_styles_signal()
 
         # Créer les composants
         self.create_components()
         self.create_ports()
 
+        # Remplissage du rectangle de remplacement (sans SVG), préparé une fois
+        self._fallback_brush = QBrush(_qcolor(self.equipment_def.get('color', '#666666')))
+
         # Style de sélection personnalisé
         self.selection_pen = QPen(QColor(0, 120, 255), 2, Qt.DashLine)  # Bleu en pointillés
         self.selection_brush = QBrush(QColor(0, 120, 255, 30))  # Bleu transparent
 
         #liste des polylignes connectées
-        self.connected_polylines: List = []  # Liste des polylignes à mettre à jour
+        # Polylignes à mettre à jour : dict utilisé comme ensemble ordonné (ajout/retrait en O(1))
+        self.connected_polylines: Dict = {}
 
     def create_components(self):
         """Crée les composants visuels de base"""
         
         # 1. Icône SVG ou fallback
-        if self.svg_path and os.path.exists(self.svg_path):
+        if self.svg_path and _svg_exists(self.svg_path):
 
             #extrait les informations du SVG
             self.ports_infos = self.read_ports_from_svg(self.svg_path)
@@ -390,6 +820,7 @@ class EquipmentGraphicsItem(QGraphicsItem):
             #redimensionner le bounding rect pour qu'il corresponde à la taille de l'élément SVG
             self.width = self.svg_item.boundingRect().width()*self.item_scale
             self.height = self.svg_item.boundingRect().height()*self.item_scale
+            self.invalidate_bounding_rect()
             #fixer le centre du SVG
             
 
@@ -400,19 +831,12 @@ class EquipmentGraphicsItem(QGraphicsItem):
         """Crée l'item SVG avec les styles de tuyaux appliqués"""
 
         #print(f"scale {self.item_scale}")
-        # Obtenir le SVG modifié avec les styles de tuyaux
-        styled_svg_content = pipe_style_manager.apply_pipe_styles_to_svg(
-            self.svg_path, self.current_visual_state, self.item_scale
-        )
-
-        #cacher les ports pour qu'ils ne soient pas visibles
-        styled_svg_content=self.hide_svg_ports(styled_svg_content)
-
+        # Obtenir le SVG modifié avec les styles de tuyaux (et les ports masqués)
+        styled_svg_content = self.build_styled_svg()
         
         if styled_svg_content:
-            # Créer le renderer SVG à partir du contenu modifié
-            svg_data = QByteArray(styled_svg_content.encode('utf-8'))
-            renderer = QSvgRenderer(svg_data)
+            # Renderer SVG du contenu modifié (partagé avec les équipements identiques)
+            renderer = self.get_shared_renderer(styled_svg_content)
             
             # Créer l'item SVG
             from PyQt5.QtSvg import QGraphicsSvgItem
@@ -420,31 +844,50 @@ class EquipmentGraphicsItem(QGraphicsItem):
             self.svg_item.setSharedRenderer(renderer)
             self.svg_item.setParentItem(self)
             
-            print(f"✅ SVG créé avec styles de tuyaux appliqués")
+            if DEBUG:
+                print(f"✅ SVG créé avec styles de tuyaux appliqués")
         else:
             # Fallback vers le SVG original
             self.svg_item = QGraphicsSvgItem(self.svg_path)
             self.svg_item.setParentItem(self)
             print(f"⚠️ Utilisation du SVG original (erreur de styling)")
 
-    #Cache les ports svg. Des ports sont ajoutés sur Inkskape pour visualiser les connexions. IDéalement, ces ports ne 
-    #sont pas visible sur le dessin, mais remplacés par les ports FlowCAD
-    def hide_svg_ports(self, svg_content: str) -> str:
-        """Cache les ports SVG"""
+    @classmethod
+    def get_shared_renderer(cls, svg_content: bytes) -> QSvgRenderer:
+        """
+        Retourne un QSvgRenderer pour ce contenu, construit une seule fois
 
-        # Parser le XML
+        Le contenu dépend du fichier, de l'état visuel, de l'échelle et des styles de tuyaux :
+        le même contenu donne toujours le même rendu, un changement de style donne une autre clé.
+        """
+        renderer = cls._renderer_cache.get(svg_content)
+        if renderer is not None:
+            cls._renderer_cache.move_to_end(svg_content)
+            return renderer
+
+        renderer = cls._renderer_intern.get(svg_content)
+        if renderer is None:
+            renderer = QSvgRenderer(QByteArray(svg_content))
+            cls._renderer_intern[svg_content] = renderer
+        cls._renderer_cache[svg_content] = renderer
+        if len(cls._renderer_cache) > cls.RENDERER_CACHE_SIZE:
+            cls._renderer_cache.popitem(last=False)
+        return renderer
+
+    def build_styled_svg(self) -> bytes:
+        """Retourne le SVG de l'équipement, styles de tuyaux appliqués et ports masqués (UTF-8)"""
+        pipe_style = _cached_scaled_style(self.current_visual_state, round(self.item_scale, 3))
+        self._svg_style_key = pipe_style
+        # Même fichier et même style → même résultat, construit une seule fois
+        return _build_equipment_svg(self.svg_path, pipe_style)
+
+    def hide_svg_ports(self, svg_content: str) -> bytes:
+        """Cache les ports SVG et renvoie le contenu encodé en UTF-8"""
+        if isinstance(svg_content, str):
+            svg_content = svg_content.encode('utf-8')  # lxml refuse une chaîne avec déclaration d'encodage
         root = ET.fromstring(svg_content)
-        
-        # Masquer les ports
-        for element in root.iter():
-            element_id = element.get('id', '')
-            
-            if re.search(r'Port(\d+)', element_id, re.IGNORECASE):
-                element.set('style', 'opacity:0')
-                print(f"⚠️ Port masqué: {element_id}")
-
-        svg_content = ET.tostring(root, encoding='unicode')
-        return svg_content
+        _hide_ports_in_tree(root)
+        return ET.tostring(root, encoding='utf-8')
 
     def update_visual_state(self, new_state: str):
         """Met à jour l'état visuel et les styles des tuyaux internes"""
@@ -452,7 +895,8 @@ class EquipmentGraphicsItem(QGraphicsItem):
             old_state = self.current_visual_state
             self.current_visual_state = new_state
             
-            print(f"🎨 État visuel {self.equipment_id}: {old_state} → {new_state}")
+            if DEBUG:
+                print(f"🎨 État visuel {self.equipment_id}: {old_state} → {new_state}")
             
             # Recréer le SVG avec les nouveaux styles
             self.update_svg_styles()
@@ -461,26 +905,51 @@ class EquipmentGraphicsItem(QGraphicsItem):
         """Met à jour les styles du SVG selon l'état actuel"""
         if not self.svg_path or not self.svg_item:
             return
-        
-        # Obtenir le SVG modifié avec les nouveaux styles
-        styled_svg_content = pipe_style_manager.apply_pipe_styles_to_svg(
-            self.svg_path, self.current_visual_state, self.item_scale
-        )
 
-        #cacher les ports pour qu'ils ne soient pas visibles
-        styled_svg_content=self.hide_svg_ports(styled_svg_content)
+        # Le rendu ne dépend que du style mis à l'échelle : inchangé → rien à refaire
+        pipe_style = _cached_scaled_style(self.current_visual_state, round(self.item_scale, 3))
+        if pipe_style == self._svg_style_key:
+            return
+        
+        # Obtenir le SVG modifié avec les nouveaux styles (et les ports masqués)
+        styled_svg_content = self.build_styled_svg()
         
         if styled_svg_content:
-            # Mettre à jour le renderer
-            svg_data = QByteArray(styled_svg_content.encode('utf-8'))
-            renderer = QSvgRenderer(svg_data)
+            # Mettre à jour le renderer (réutilisé s'il a déjà été construit)
+            renderer = self.get_shared_renderer(styled_svg_content)
             self.svg_item.setSharedRenderer(renderer)
             
-            print(f"🔄 Styles SVG mis à jour pour {self.equipment_id}")
+            if DEBUG:
+                print(f"🔄 Styles SVG mis à jour pour {self.equipment_id}")
+
+    @classmethod
+    def _connect_styles_signal(cls):
+        """Connecte une seule fois le signal des styles au répartiteur de la classe"""
+        if not cls._styles_signal_connected:
+            pipe_style_manager.styles_changed.connect(cls._dispatch_pipe_styles_changed)
+            cls._styles_signal_connected = True
+
+    @classmethod
+    def _dispatch_pipe_styles_changed(cls):
+        """
+        Relaie un changement de styles globaux aux équipements vivants, au prochain tour de boucle :
+        les états modifiés à la suite (normal, selected, hover d'une palette) ne redessinent qu'une fois
+        """
+        if not cls._styles_update_pending:
+            cls._styles_update_pending = True
+            QTimer.singleShot(0, cls._flush_pipe_styles_changed)
+
+    @classmethod
+    def _flush_pipe_styles_changed(cls):
+        """Met à jour les styles de tous les équipements vivants (voir _dispatch_pipe_styles_changed)"""
+        cls._styles_update_pending = False
+        for equipment in list(cls._instances):
+            equipment.on_pipe_styles_changed()
 
     def on_pipe_styles_changed(self):
         """Callback quand les styles globaux des tuyaux changent"""
-        print(f"🎨 Styles globaux changés - mise à jour {self.equipment_id}")
+        if DEBUG:
+            print(f"🎨 Styles globaux changés - mise à jour {self.equipment_id}")
         self.update_svg_styles()
     
     def set_item_scale(self, new_scale: float):
@@ -502,20 +971,22 @@ class EquipmentGraphicsItem(QGraphicsItem):
             if self.svg_item:
                 self.width = self.svg_item.boundingRect().width() * self.item_scale
                 self.height = self.svg_item.boundingRect().height() * self.item_scale
+                self.invalidate_bounding_rect()
             
             # Mettre à jour les styles avec la nouvelle échelle
             self.update_svg_styles()
             
-            print(f"📏 Échelle {self.equipment_id}: {old_scale:.3f} → {new_scale:.3f}")
+            if DEBUG:
+                print(f"📏 Échelle {self.equipment_id}: {old_scale:.3f} → {new_scale:.3f}")
     
     def get_effective_stroke_width(self, base_width: float) -> float:
         """Retourne l'épaisseur effective d'un trait selon l'échelle actuelle"""
-        return pipe_style_manager.calculate_optimal_stroke_width(base_width, self.item_scale)
+        return _cached_stroke_width(base_width, round(self.item_scale, 3))
 
     def get_scale_info(self) -> dict:
         """Retourne des informations sur l'échelle et les ajustements"""
         base_style = pipe_style_manager.get_pipe_style(self.current_visual_state)
-        scaled_style = pipe_style_manager.get_scaled_pipe_style(self.current_visual_state, self.item_scale)
+        scaled_style = dict(_cached_scaled_style(self.current_visual_state, round(self.item_scale, 3)))
         
         return {
             'item_scale': self.item_scale,
@@ -525,58 +996,21 @@ class EquipmentGraphicsItem(QGraphicsItem):
             'svg_dimensions': f"{self.width:.1f}x{self.height:.1f}"
         }
 
-    def __del__(self):
-        """Nettoyage lors de la destruction"""
-        # Se déconnecter des signaux pour éviter les fuites mémoire
-        try:
-            pipe_style_manager.styles_changed.disconnect(self.on_pipe_styles_changed)
-        except:
-            pass
+    def destroy(self):
+        """Nettoie l'équipement avant destruction (appelé par le canvas à la suppression)"""
+        # Ne plus recevoir les changements de styles globaux
+        type(self)._instances.discard(self)
 
     #Lit le nombre de ports et leur position en fonction des informations contenues dans le SVG----------------
     def read_ports_from_svg(self, svg_path: str) -> List[dict]:
 
-        #ouvre le fichier SVG
-        with open(svg_path, 'r', encoding='utf-8') as f:
-            svg_content = f.read()
-        
-        #liste des ports
-        ports = []
-
-        #parse le contenu SVG pour extraire les informations des ports
-        root = ET.fromstring(svg_content)
-
-        # Extraire les dimensions du SVG
-        width = float(root.get('width'))
-        height = float(root.get('height'))
-        viewBox = root.get('viewBox')
-        min_x, min_y, vb_width, vb_height = map(float, viewBox.split())
+        # Le fichier n'est lu et analysé qu'une fois par chemin (voir _read_svg_geometry)
+        width, height, vb_width, vb_height, port_positions = _read_svg_geometry(svg_path)
         print(f"SVG dimensions: width={width}, height={height}, viewbox width={vb_width}, height={vb_height}")
         print(f"\nElement default size: {self.width} x {self.height}")
 
-        # Chercher tous les éléments avec un attribut id
-        for element in root.iter() :
-            element_id = element.get('id', '')
-        
-            # Vérifier si l'id contient "Port" suivi d'un nombre
-            match = re.search(r'Port(\d+)', element_id, re.IGNORECASE)
-        
-            if match:
-                numero_port = int(match.group(1))
-            
-                # Extraire les coordonnées cx et cy
-                cx = element.get('cx')
-                cy = element.get('cy')
-            
-                if cx is not None and cy is not None:
-                    ports.append({
-                        'port': numero_port,
-                        'x': float(cx)/vb_width*width,
-                        'y': float(cy)/vb_height*height
-                    })
-
-        #trier les ports par numéro
-        ports.sort(key=lambda x: x['port'])
+        #liste des ports (copie propre à l'équipement)
+        ports = [{'port': numero_port, 'x': x, 'y': y} for numero_port, x, y in port_positions]
 
         #afficher les ports
         for port in ports:
@@ -603,27 +1037,47 @@ class EquipmentGraphicsItem(QGraphicsItem):
         
         # Stocker le port
         self.ports[port_id] = port_item
+        self._ports_list.append(port_item)
+
+        # Étendre l'enveloppe des ports (utilisée par boundingRect)
+        port_rect = port_item.boundingRect().translated(x, y)
+        if self._port_bbox is None:
+            self._port_bbox = (port_rect.left(), port_rect.top(), port_rect.right(), port_rect.bottom())
+        else:
+            xmin, ymin, xmax, ymax = self._port_bbox
+            self._port_bbox = (min(xmin, port_rect.left()), min(ymin, port_rect.top()),
+                               max(xmax, port_rect.right()), max(ymax, port_rect.bottom()))
+        self.invalidate_bounding_rect()
 
     #bounding rectangle (classe abstraite de QGraphicsItem)
     #définit la zone de collision/sélection complète
     def boundingRect(self) -> QRectF:
         """Définit la zone de collision/sélection complète"""
+
+        # Appelé par Qt à chaque dessin et test de collision : calculé une fois, puis réutilisé
+        # jusqu'au prochain changement de géométrie (voir invalidate_bounding_rect)
+        if self._cached_bounding_rect is not None:
+            return self._cached_bounding_rect
         
         # Zone principale de l'équipement
         margin = 0 #une marge pour "englober les ports. Le but est que l'élément reste symétrique"
         equipment_rect = QRectF(0-margin, 0-margin, self.width+margin, self.height+margin)
         #print(f"boundingRect: {equipment_rect.width()} x {equipment_rect.height()}")
 
-        # Inclure les ports (avec une marge pour faciliter la sélection)
-        #port_margin = 3
-        for port in self.ports.values():
-            port_rect = port.boundingRect()
-            port_rect.translate(port.pos())
-            #port_rect.adjust(-port_margin, -port_margin, port_margin, port_margin)
-            equipment_rect = equipment_rect.united(port_rect)
+        # Inclure les ports : leur enveloppe est tenue à jour par create_port, pas de boucle ici
+        if self._port_bbox is not None:
+            xmin, ymin, xmax, ymax = self._port_bbox
+            equipment_rect = equipment_rect.united(QRectF(QPointF(xmin, ymin), QPointF(xmax, ymax)))
         
         #print(f"boundingRect final: {equipment_rect.width()} x {equipment_rect.height()}")
+        self._cached_bounding_rect = equipment_rect
         return equipment_rect
+
+    def invalidate_bounding_rect(self):
+        """À appeler quand les dimensions ou les ports changent"""
+        self.prepareGeometryChange()
+        self._cached_bounding_rect = None
+        self._last_scene_rect = None
     
     #dessin de l'équipement (classe abstraite de QGraphicsItem)
     # définit la méthode de dessin
@@ -632,14 +1086,12 @@ class EquipmentGraphicsItem(QGraphicsItem):
         
         # Si pas de SVG, dessiner un rectangle coloré
         if not self.svg_item:
-            color = QColor(self.equipment_def.get('color', '#666666'))
-            
-            painter.fillRect(0, 0, self.width, self.height, color)
-            painter.setPen(QPen(Qt.black, 2))
+            painter.fillRect(0, 0, self.width, self.height, self._fallback_brush)
+            painter.setPen(self.FALLBACK_BORDER_PEN)
             painter.drawRect(0, 0, self.width, self.height)
             
             # Dessiner un "?" au centre
-            painter.setPen(QPen(Qt.white))
+            painter.setPen(self.FALLBACK_TEXT_PEN)
             painter.drawText(QRectF(0, 0, self.width, self.height), Qt.AlignCenter, "?")
 
         #Si l'élément est séectionné, dessiner la boîte de sélection
@@ -669,35 +1121,22 @@ class EquipmentGraphicsItem(QGraphicsItem):
     def draw_selection_handles(self, painter: QPainter, rect: QRectF):
         """Dessine des petites poignées aux coins (optionnel)"""
         
-        handle_size = 6
-        handle_pen = QPen(QColor(0, 120, 255), 1)
-        handle_brush = QBrush(Qt.white)
-        
-        painter.setPen(handle_pen)
-        painter.setBrush(handle_brush)
-        
-        # Positions des poignées (coins + milieux)
-        handles = [
-            # Coins
-            (rect.topLeft(), "top-left"),
-            (rect.topRight(), "top-right"), 
-            (rect.bottomLeft(), "bottom-left"),
-            (rect.bottomRight(), "bottom-right"),
-            # Milieux (optionnel)
-            (rect.center().x(), rect.top()),      # Haut
-            (rect.center().x(), rect.bottom()),   # Bas
-            (rect.left(), rect.center().y()),     # Gauche
-            (rect.right(), rect.center().y())     # Droite
-        ]
-        
-        for handle in handles[:4]:  # Seulement les coins pour l'instant
-            if isinstance(handle[0], tuple):
-                x, y = handle[0]
-            else:
-                x, y = handle[0].x(), handle[0].y()
-            
-            handle_rect = QRectF(x - handle_size/2, y - handle_size/2, handle_size, handle_size)
-            painter.drawRect(handle_rect)
+        painter.setPen(self.HANDLE_PEN)
+        painter.setBrush(self.HANDLE_BRUSH)
+
+        # Les rectangles des poignées ne changent qu'avec le rectangle de sélection
+        if self._handle_rects is None or self._handle_source_rect != rect:
+            handle_size = 6
+            # Seulement les coins pour l'instant
+            corners = (rect.topLeft(), rect.topRight(), rect.bottomLeft(), rect.bottomRight())
+            self._handle_rects = [
+                QRectF(corner.x() - handle_size/2, corner.y() - handle_size/2, handle_size, handle_size)
+                for corner in corners
+            ]
+            self._handle_source_rect = QRectF(rect)
+
+        # Un seul appel de dessin pour toutes les poignées
+        painter.drawRects(self._handle_rects)
     
     def mousePressEvent(self, event):
         """Gestion des clics sur l'équipement"""
@@ -719,7 +1158,7 @@ class EquipmentGraphicsItem(QGraphicsItem):
     
     def get_all_ports(self) -> List[PortGraphicsItem]:
         """Récupère tous les ports"""
-        return list(self.ports.values())
+        return list(self._ports_list)
     
     def connect_port(self, port_id: str):
         """Marque un port comme connecté"""
@@ -735,19 +1174,21 @@ class EquipmentGraphicsItem(QGraphicsItem):
 
     def get_free_ports(self) -> List[PortGraphicsItem]:
         """Récupère tous les ports libres"""
-        return [port for port in self.ports.values() if port.is_free()]
+        return [port for port in self._ports_list if port.is_free()]
 
     def get_connected_ports(self) -> List[PortGraphicsItem]:
         """Récupère tous les ports connectés"""
-        return [port for port in self.ports.values() if port.is_connected()]
+        return [port for port in self._ports_list if port.is_connected()]
 
     def itemChange(self, change, value):
         """Réagit aux changements d'état de l'item"""
 
         if self.scene():
-            old_scene_rect = self.mapRectToScene(self.boundingRect())
-            old_scene_rect = old_scene_rect.adjusted(-10, -10, 10, 10)  # Marge de sécurité
-            self.scene().update(old_scene_rect)
+            # Zone occupée jusqu'ici : celle calculée au dernier déplacement, si elle est encore valide
+            old_scene_rect = self._last_scene_rect
+            if old_scene_rect is None:
+                old_scene_rect = self._last_scene_rect = self._compute_scene_rect()
+            self.queue_scene_update(old_scene_rect)
         
         if change == QGraphicsItem.ItemSelectedChange:
             # L'état de sélection a changé
@@ -764,11 +1205,25 @@ class EquipmentGraphicsItem(QGraphicsItem):
             #si l'objet est bougé, mettre à jour la polyligne
             self.update_connected_polylines()
             if self.scene():
-                new_scene_rect = self.mapRectToScene(self.boundingRect())
-                new_scene_rect = new_scene_rect.adjusted(-10, -10, 10, 10)  # Marge de sécurité
-                self.scene().update(new_scene_rect)
+                new_scene_rect = self._last_scene_rect = self._compute_scene_rect()
+                self.queue_scene_update(new_scene_rect)
 
         return super().itemChange(change, value)
+
+    def _compute_scene_rect(self) -> QRectF:
+        """Zone de la scène occupée par l'équipement, avec une marge de sécurité"""
+        scene_rect = self.mapRectToScene(self.boundingRect())
+        scene_rect.adjust(-10, -10, 10, 10)  # Marge de sécurité (modifiée en place)
+        return scene_rect
+
+    def queue_scene_update(self, rect: QRectF):
+        """
+        Demande le rafraîchissement d'une zone de la scène
+
+        Pendant un déplacement, itemChange est appelé à chaque mouvement de souris : les zones
+        sont réunies et la scène n'est mise à jour qu'une fois (voir schedule_scene_update).
+        """
+        schedule_scene_update(self.scene(), rect)
     
     #fonction qui tourne l'équipement d'un angle donné
     def set_rotation_angle(self, angle: float):
@@ -786,54 +1241,72 @@ class EquipmentGraphicsItem(QGraphicsItem):
             self.mirror_v = not self.mirror_v  # toggle vertical
         self.update_transform()
 
-    def update_transform(self):
+    @staticmethod
+    def _build_core_transform(rotation_angle: float, mirror_h: bool, mirror_v: bool) -> QTransform:
+        """Miroir puis rotation (sans les translations autour du centre)"""
         t = QTransform()
-        #enter = self.boundingRect().center()
-        enter = self.center
-        print(f"Centre de l'équipement: {enter.x()}, {enter.y()}")
-        #transformations de l'equipement
-        print(f"Transformations: rotation {self.rotation_angle}°, miroir_h {self.mirror_h}, miroir_v {self.mirror_v}")
-        # 1. Translation au centre
-        t.translate(enter.x(), enter.y())
-        # 2. Appliquer le miroir (scale)
-        if self.rotation_angle in [90, 270]:
+        # Appliquer le miroir (scale)
+        if rotation_angle in [90, 270]:
             #si l'angle est à 90 ou 270, inverser les axes de miroir
-            sx = -1 if self.mirror_h else 1
-            sy = -1 if self.mirror_v else 1
+            sx = -1 if mirror_h else 1
+            sy = -1 if mirror_v else 1
         else:
-            sx = -1 if self.mirror_v else 1
-            sy = -1 if self.mirror_h else 1
+            sx = -1 if mirror_v else 1
+            sy = -1 if mirror_h else 1
         t.scale(sx, sy)
-        # 3. Appliquer la rotation (autour du centre)
+        # Appliquer la rotation (autour du centre)
         #changer le sens de rotation si un mirroir a été fait
-        if self.mirror_h ^ self.mirror_v:
-            t.rotate(-self.rotation_angle)
+        if mirror_h ^ mirror_v:
+            t.rotate(-rotation_angle)
         else:
-            t.rotate(self.rotation_angle)
-        # 4. Revenir au centre d'origine
-        t.translate(-enter.x(), -enter.y())
+            t.rotate(rotation_angle)
+        return t
+
+    def update_transform(self):
+        #enter = self.boundingRect().center()
+        enter = self.center
+        print(f"Centre de l'équipement: {enter.x()}, {enter.y()}")
+        #transformations de l'equipement
+        print(f"Transformations: rotation {self.rotation_angle}°, miroir_h {self.mirror_h}, miroir_v {self.mirror_v}")
+        # Miroir + rotation : peu de combinaisons possibles, chacune calculée une seule fois
+        key = (self.rotation_angle, self.mirror_h, self.mirror_v)
+        core = self._TRANSFORM_TABLE.get(key)
+        if core is None:
+            core = self._TRANSFORM_TABLE[key] = self._build_core_transform(*key)
+        # Appliquée autour du centre : retour à l'origine, miroir/rotation, puis translation au centre
+        t = QTransform.fromTranslate(-enter.x(), -enter.y()) * core * QTransform.fromTranslate(enter.x(), enter.y())
         self.setTransform(t)
+        self._last_scene_rect = None  # La zone occupée dans la scène a changé
+        # Les ports ont bougé dans la scène : les positions mémorisées par les polylignes sont périmées
+        for polyline in self.connected_polylines:
+            if hasattr(polyline, 'invalidate_port_positions'):
+                polyline.invalidate_port_positions()
         self.update()
 
     def add_connected_polyline(self, polyline):
         """Ajoute une polyligne à la liste des connexions de cet équipement"""
         if polyline not in self.connected_polylines:
-            self.connected_polylines.append(polyline)
+            self.connected_polylines[polyline] = None
             print(f"🔗 Polyligne ajoutée aux connexions de {self.equipment_id}")
     
+    def add_connected_polylines(self, polylines):
+        """Ajoute plusieurs polylignes d'un coup (chargement d'un projet)"""
+        self.connected_polylines.update(dict.fromkeys(polylines))
+        print(f"🔗 {len(polylines)} polylignes ajoutées aux connexions de {self.equipment_id}")
+    
     def remove_connected_polyline(self, polyline):
         """Retire une polyligne de la liste des connexions"""
         if polyline in self.connected_polylines:
-            self.connected_polylines.remove(polyline)
+            del self.connected_polylines[polyline]
             print(f"🔗 Polyligne retirée des connexions de {self.equipment_id}")
     
     def update_connected_polylines(self):
         """Met à jour toutes les polylignes connectées à cet équipement"""
-        for polyline in self.connected_polylines:
-            if hasattr(polyline, 'update_connection_points'):
-                polyline.update_connection_points()
-            else:
-                print(f"⚠️ Polyligne sans méthode update_connection_points")
+        global _PolylineGraphicsItem
+        if _PolylineGraphicsItem is None:
+            from .polyline_graphics import PolylineGraphicsItem as _PolylineGraphicsItem
+
+        _PolylineGraphicsItem.update_all(self.connected_polylines, self)
 
         print(f"🔄 {len(self.connected_polylines)} polylignes mises à jour pour {self.equipment_id}")
 
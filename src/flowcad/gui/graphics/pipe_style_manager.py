@@ -5,20 +5,78 @@ Gestionnaire de styles pour synchroniser l'apparence des tuyaux
 entre les polylignes et les éléments SVG des équipements
 """
 
-import xml.etree.ElementTree as ET
+try:
+    # lxml (optionnel) : analyse et sérialisation en C, même API que ElementTree pour ce qui est utilisé ici
+    from lxml import etree as ET
+
+    # Recherche des éléments Pipexxx faite par libxml2 (id commençant par "pipe", casse ignorée),
+    # requête compilée une seule fois
+    _PIPE_XPATH = ET.XPath("descendant-or-self::*[starts-with(translate(@id, 'PIPE', 'pipe'), 'pipe')]")
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _PIPE_XPATH = None
+import os
 import re
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from PyQt5.QtGui import QColor, QPen
 from PyQt5.QtCore import QObject, pyqtSignal
 
+# Index des états visuels, pour des clés de cache en petits entiers
+_STATE_IDX = {'normal': 0, 'selected': 1, 'hover': 2}
+
+# Balise ouvrante d'un élément Pipe dans le SVG brut (réécriture sans parser, voir _fast_modify)
+_PIPE_TAG_RE = re.compile(rb'<[a-z][^<>]*?\sid\s*=\s*["\']pipe[^<>]*>', re.IGNORECASE)
+
+# Tout attribut id Pipe du SVG brut, reconnu ou non par _PIPE_TAG_RE (par exemple dans une balise
+# dont une valeur d'attribut contient ">") : si les deux comptes diffèrent, passer par l'arbre
+_PIPE_ID_RE = re.compile(rb'(?<=\s)id\s*=\s*["\']pipe', re.IGNORECASE)
+
+def scaled_stroke_width(base_width: float, scale_factor: float) -> float:
+    """
+    Épaisseur effective d'un trait d'épaisseur base_width sur un équipement à l'échelle scale_factor
+    (règle unique, partagée par les styles SVG des tuyaux et les équipements)
+    """
+    if scale_factor <= 0:
+        return base_width
+
+    # Calcul de l'épaisseur effective
+    # Si l'échelle est petite (< 1), on veut garder une épaisseur minimale visible
+    # Si l'échelle est grande (> 1), on peut réduire proportionnellement
+    adjusted_width = base_width / scale_factor
+    if scale_factor < 1.0:
+        # Limiter à une épaisseur maximale raisonnable
+        adjusted_width = min(adjusted_width, base_width * 3)
+
+    # Garantir une épaisseur minimale pour la visibilité
+    return max(adjusted_width, 0.5)
+
 class PipeStyleManager(QObject):
     """Gestionnaire central des styles de tuyaux"""
     
     # Signal émis quand les styles changent
     styles_changed = pyqtSignal()
+
+    # Attributs SVG qu'un style de tuyau peut modifier
+    STYLE_ATTRIBUTES = ('stroke', 'stroke-width', 'fill', 'stroke-linecap', 'stroke-linejoin')
+    # Les mêmes, pour les tests d'appartenance (hachage au lieu d'un parcours du tuple)
+    _STYLE_ATTRIBUTE_SET = frozenset(STYLE_ATTRIBUTES)
+    # Attributs d'origine affichés en debug par apply_style_to_element
+    _DEBUG_ATTRIBUTES = ('stroke', 'stroke-width', 'fill')
+
+    # Attribut de style dans une balise brute (précédé d'un blanc, valeur entre " ou ')
+    _ATTR_RES = {attr: re.compile(rb'(?<=\s)' + attr.encode('ascii') + rb'\s*=\s*(?:"[^"]*"|\'[^\']*\')')
+                 for attr in STYLE_ATTRIBUTES}
+
+    # Nombre de SVG modifiés gardés en mémoire (chaque zoom produit de nouvelles échelles)
+    SVG_CACHE_SIZE = 256
     
-    def __init__(self):
+    def __init__(self, svg_cache_size: int = SVG_CACHE_SIZE):
+        """
+        Args:
+            svg_cache_size: nombre maximal de SVG modifiés gardés en mémoire (voir modified_svg_cache)
+        """
         super().__init__()
         
         # Styles par défaut des tuyaux (synchronisés avec polyline_graphics.py)
@@ -46,9 +104,60 @@ class PipeStyleManager(QObject):
             }
         }
         
-        # Cache des SVG modifiés
-        self.modified_svg_cache: Dict[str, str] = {}
+        # Traces de debug (désactivées : ces méthodes sont appelées pour chaque élément Pipe)
+        self._debug = False
+
+        # Attributs de style par état, prêts à appliquer (stroke-width seul dépend de l'échelle)
+        self._static_style_items: Dict[str, tuple] = {}
+        self._rebuild_static_styles()
+
+        # Identifiant entier attribué à chaque chemin SVG rencontré (clés de cache légères)
+        self._path_ids: Dict[str, int] = {}
+        self._next_id = 0
+
+        # Cache des SVG modifiés, borné : les moins récemment utilisés sont évincés
+        self.modified_svg_cache = OrderedDict()
+        self.svg_cache_size = svg_cache_size
+
+        # Cache des SVG analysés : date de modification du fichier (ns), racine + éléments Pipe,
+        # par chemin (arbres modifiés en place à chaque style)
+        self._parsed_cache: Dict[str, Tuple[int, ET.Element, List[ET.Element]]] = {}
+
+        # Dernier style appliqué à chaque arbre analysé : (attributs de l'état, épaisseur)
+        self._last_applied: Dict[str, Tuple[tuple, Optional[str]]] = {}
+
+        # SVG sans élément Pipe : contenu sérialisé une seule fois, quel que soit l'état ou l'échelle
+        self._unstyled_svg_cache: Dict[str, bytes] = {}
+
+        # Épaisseurs déjà formatées, par centièmes (quelques centaines de valeurs distinctes au plus)
+        self._width_fmt_cache: Dict[int, str] = {}
+
+        # Cache des styles mis à l'échelle, par (état, échelle au millième)
+        self._scaled_style_cache: Dict[Tuple[str, int], Dict[str, str]] = {}
     
+    def _id(self, svg_path: str) -> int:
+        """Identifiant entier du chemin SVG (attribué à la première rencontre)"""
+        path_id = self._path_ids.get(svg_path)
+        if path_id is None:
+            path_id = self._path_ids[svg_path] = self._next_id
+            self._next_id += 1
+        return path_id
+
+    def _log(self, msg: str, *args):
+        """Affiche un message de debug ; le formatage n'a lieu que si le debug est actif"""
+        if self._debug:
+            print(msg.format(*args) if args else msg)
+
+    def _rebuild_static_styles(self):
+        """Précalcule, pour chaque état, les attributs de style qui ne dépendent pas de l'échelle"""
+        # stroke-width garde sa place (valeur None, remplie à l'application) pour conserver
+        # l'ordre des attributs dans le SVG produit
+        self._static_style_items = {
+            state: tuple((attr, None if attr == 'stroke-width' else style[attr])
+                         for attr in self.STYLE_ATTRIBUTES if attr in style)
+            for state, style in self.pipe_styles.items()
+        }
+
     def get_pipe_style(self, state: str = 'normal') -> Dict[str, str]:
         """Retourne le style des tuyaux pour un état donné"""
         return self.pipe_styles.get(state, self.pipe_styles['normal']).copy()
@@ -59,15 +168,21 @@ class PipeStyleManager(QObject):
             self.pipe_styles[state] = {}
         
         self.pipe_styles[state].update(style_attrs)
+        self._rebuild_static_styles()
         
-        # Vider le cache car les styles ont changé
+        # Vider le cache car les styles ont changé (un nouvel attribut ne doit pas rester
+        # sur les arbres déjà stylés)
         self.modified_svg_cache.clear()
+        self._parsed_cache.clear()
+        self._last_applied.clear()
+        self._unstyled_svg_cache.clear()
+        self._scaled_style_cache.clear()
         
         # Notifier les changements
         self.styles_changed.emit()
-        print(f"🎨 Style tuyau '{state}' mis à jour: {style_attrs}")
+        self._log("🎨 Style tuyau '{}' mis à jour: {}", state, style_attrs)
     
-    def apply_pipe_styles_to_svg(self, svg_path: str, state: str = 'normal', scale_factor: float = 1.0) -> str:
+    def apply_pipe_styles_to_svg(self, svg_path: str, state: str = 'normal', scale_factor: float = 1.0) -> bytes:
         """
         Applique les styles de tuyaux aux éléments Pipexxx dans un SVG
         
@@ -77,54 +192,173 @@ class PipeStyleManager(QObject):
             scale_factor: Facteur d'échelle de l'équipement (pour ajuster stroke-width)
         
         Returns:
-            Contenu SVG modifié avec styles appliqués
+            Contenu SVG modifié avec styles appliqués (UTF-8, directement utilisable par QSvgRenderer)
         """
-        cache_key = f"{svg_path}:{state}:{scale_factor:.3f}"
+        cache_key = (self._id(svg_path), _STATE_IDX.get(state, state), int(round(scale_factor * 1000)))
         
         # Vérifier le cache
-        if cache_key in self.modified_svg_cache:
-            return self.modified_svg_cache[cache_key]
+        cached = self.modified_svg_cache.get(cache_key)
+        if cached is not None:
+            self.modified_svg_cache.move_to_end(cache_key)
+            return cached
         
-        # Lire le fichier SVG
-        try:
-            with open(svg_path, 'r', encoding='utf-8') as f:
-                svg_content = f.read()
-        except Exception as e:
-            print(f"❌ Erreur lecture SVG {svg_path}: {e}")
-            return ""
-        
-        # Modifier le SVG avec le facteur d'échelle
-        modified_svg = self.modify_svg_pipe_elements(svg_content, state, scale_factor)
+        # Arbre du SVG déjà analysé pour un autre état ou une autre échelle ?
+        parsed = self._get_parsed_svg(svg_path)
+        if parsed is None:
+            return b""
+        root, pipe_elements = parsed
+
+        if not pipe_elements:
+            # Rien à styler : même contenu pour tous les états et toutes les échelles
+            unstyled = self._unstyled_svg_cache.get(svg_path)
+            if unstyled is None:
+                unstyled = self._unstyled_svg_cache[svg_path] = ET.tostring(
+                    root, encoding='utf-8', xml_declaration=False)
+            return unstyled
+
+        # Modifier le SVG avec le facteur d'échelle : seuls les éléments Pipe sont retouchés,
+        # et seulement pour les attributs qui diffèrent du dernier style appliqué à cet arbre
+        static_items, stroke_width = self.get_scaled_style_parts(state, scale_factor)
+        changed_items = self._changed_style_items(svg_path, static_items, stroke_width)
+        self._last_applied[svg_path] = (static_items, stroke_width)
+        for element in pipe_elements:
+            self.apply_style_parts_to_element(element, changed_items, stroke_width)
+        modified_svg = ET.tostring(root, encoding='utf-8', xml_declaration=False)
         
         # Mettre en cache
         self.modified_svg_cache[cache_key] = modified_svg
+        if len(self.modified_svg_cache) > self.svg_cache_size:
+            self.modified_svg_cache.popitem(last=False)
         
         return modified_svg
     
-    def modify_svg_pipe_elements(self, svg_content: str, state: str, scale_factor: float = 1.0) -> str:
-        """Modifie les éléments Pipexxx dans le contenu SVG avec ajustement d'échelle"""
+    def _get_parsed_svg(self, svg_path: str) -> Optional[Tuple[ET.Element, List[ET.Element]]]:
+        """
+        Racine et éléments Pipe du SVG, analysé une seule fois tant que le fichier n'est pas
+        modifié sur disque (date comparée à chaque appel). None si le fichier est illisible.
+        """
         try:
-            # Parser le XML
-            root = ET.fromstring(svg_content)
-            
-            # Obtenir les styles à appliquer avec ajustement d'échelle
-            pipe_style = self.get_scaled_pipe_style(state, scale_factor)
+            mtime = os.stat(svg_path).st_mtime_ns
+        except OSError as e:
+            print(f"❌ Erreur lecture SVG {svg_path}: {e}")
+            return None
+
+        parsed = self._parsed_cache.get(svg_path)
+        if parsed is not None and parsed[0] == mtime:
+            return parsed[1], parsed[2]
+
+        # Lire et analyser le fichier SVG (première fois, ou fichier modifié depuis)
+        try:
+            root = ET.parse(svg_path).getroot()
+        except ET.ParseError as e:
+            print(f"❌ Erreur parsing SVG: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ Erreur lecture SVG {svg_path}: {e}")
+            return None
+        pipe_elements = self.find_pipe_elements(root)
+        if parsed is not None:
+            # Fichier modifié : les SVG produits à partir de l'ancien contenu ne sont plus valables
+            path_id = self._id(svg_path)
+            for key in [key for key in self.modified_svg_cache if key[0] == path_id]:
+                del self.modified_svg_cache[key]
+        self._parsed_cache[svg_path] = (mtime, root, pipe_elements)
+        self._last_applied.pop(svg_path, None)  # Nouvel arbre : tous les attributs à écrire
+        self._unstyled_svg_cache.pop(svg_path, None)
+        return root, pipe_elements
+
+    def _changed_style_items(self, svg_path: str, static_items: tuple, stroke_width: Optional[str]) -> tuple:
+        """Attributs de style à réécrire sur l'arbre de svg_path (tous à la première application)"""
+        last = self._last_applied.get(svg_path)
+        if last is None:
+            return static_items
+
+        # stroke-width (valeur None) ne change qu'avec l'échelle, les autres qu'avec l'état
+        last_items, last_width = last
+        last_values = dict(last_items)
+        width_changed = stroke_width != last_width
+        return tuple((attr, value) for attr, value in static_items
+                     if (width_changed if value is None else last_values.get(attr) != value))
+
+    def modify_svg_pipe_elements(self, svg_content: Union[str, bytes], state: str, scale_factor: float = 1.0) -> bytes:
+        """
+        Modifie les éléments Pipexxx dans le contenu SVG avec ajustement d'échelle
+
+        Le contenu peut être passé tel que lu sur disque (bytes) : expat décode lui-même,
+        sans chaîne Python intermédiaire. Le résultat est en bytes UTF-8, comme attendu par QSvgRenderer.
+        Les attributs sont d'abord réécrits directement dans le texte ; l'arbre XML n'est construit
+        que si toutes les balises Pipe n'y ont pas été reconnues (voir _fast_modify).
+        """
+        svg_bytes = svg_content.encode('utf-8') if isinstance(svg_content, str) else svg_content
+        static_items, stroke_width = self.get_scaled_style_parts(state, scale_factor)
+        modified = self._fast_modify(svg_bytes, static_items, stroke_width)
+        if modified is not None:
+            return modified
+
+        try:
+            # Parser le XML (en bytes : lxml refuse une chaîne qui porte une déclaration d'encodage)
+            root = ET.fromstring(svg_bytes)
             
             # Rechercher tous les éléments avec ID contenant "Pipe"
             pipe_elements = self.find_pipe_elements(root)
             
-            print(f"🔍 Trouvé {len(pipe_elements)} éléments Pipe (échelle: {scale_factor:.3f})")
+            self._log("🔍 Trouvé {} éléments Pipe (échelle: {:.3f})", len(pipe_elements), scale_factor)
             
             # Appliquer les styles
             for element in pipe_elements:
-                self.apply_style_to_element(element, pipe_style)
+                self.apply_style_parts_to_element(element, static_items, stroke_width)
             
-            # Reconvertir en string
-            return ET.tostring(root, encoding='unicode')
+            # Resérialiser directement en UTF-8
+            return ET.tostring(root, encoding='utf-8', xml_declaration=False)
             
         except ET.ParseError as e:
             print(f"❌ Erreur parsing SVG: {e}")
-            return svg_content  # Retourner l'original en cas d'erreur
+            # Retourner l'original en cas d'erreur
+            return svg_bytes
+
+    def rewrite_pipe_styles(self, svg_bytes: bytes, style_items: tuple, expected_count: int) -> Optional[bytes]:
+        """
+        Applique un style (paires (attribut, valeur)) aux balises Pipe directement dans le SVG brut,
+        sans arbre ni sérialisation. Retourne None si le nombre de balises réécrites n'est pas
+        expected_count (balise non reconnue par l'expression régulière : passer par l'arbre).
+        """
+        allowed = self._STYLE_ATTRIBUTE_SET
+        static_items = tuple((attr, value) for attr, value in style_items if attr in allowed)
+        return self._fast_modify(svg_bytes, static_items, None, expected_count)
+
+    def _fast_modify(self, svg_bytes: bytes, static_items: tuple, stroke_width: Optional[str],
+                     expected_count: Optional[int] = None) -> Optional[bytes]:
+        """
+        Réécrit les attributs de style des balises Pipe directement dans le SVG brut,
+        sans construire d'arbre. Retourne None si aucune balise Pipe n'est trouvée, ou si leur
+        nombre n'est pas expected_count (par défaut : le nombre d'attributs id Pipe du texte) ;
+        l'appelant passe alors par l'arbre.
+        """
+        if expected_count is None:
+            expected_count = len(_PIPE_ID_RE.findall(svg_bytes))
+
+        replacements = []
+        for attr, value in static_items:
+            if value is None:
+                value = stroke_width
+            value = value.replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;')
+            replacements.append((self._ATTR_RES[attr], f'{attr}="{value}"'.encode('utf-8')))
+
+        def rewrite_tag(match):
+            tag = match.group(0)
+            for attr_re, new_attr in replacements:
+                tag, count = attr_re.subn(lambda m: new_attr, tag, count=1)
+                if not count:
+                    # Attribut absent : ajouté avant la fin de la balise (> ou />)
+                    end = len(tag) - 2 if tag.endswith(b'/>') else len(tag) - 1
+                    tag = tag[:end] + b' ' + new_attr + tag[end:]
+            return tag
+
+        modified, count = _PIPE_TAG_RE.subn(rewrite_tag, svg_bytes)
+        self._log("🔍 Réécriture directe de {} éléments Pipe", count)
+        if not count or count != expected_count:
+            return None
+        return modified
 
     def get_scaled_pipe_style(self, state: str = 'normal', scale_factor: float = 1.0) -> Dict[str, str]:
         """
@@ -137,34 +371,44 @@ class PipeStyleManager(QObject):
         Returns:
             Style avec stroke-width ajusté
         """
-        base_style = self.pipe_styles.get(state, self.pipe_styles['normal']).copy()
-        
-        # Ajuster stroke-width selon l'échelle
-        if 'stroke-width' in base_style and scale_factor > 0:
-            original_width = float(base_style['stroke-width'])
-            
-            # Calcul de l'épaisseur effective
-            # Si l'échelle est petite (< 1), on veut garder une épaisseur minimale visible
-            # Si l'échelle est grande (> 1), on peut réduire proportionnellement
-            
-            if scale_factor < 1.0:
-                # Pour les petites échelles : épaisseur inversement proportionnelle mais avec minimum
-                adjusted_width = original_width / scale_factor
-                # Limiter à une épaisseur maximale raisonnable
-                adjusted_width = min(adjusted_width, original_width * 3)
-                
-            else:
-                # Pour les échelles normales/grandes : proportionnel direct
-                adjusted_width = original_width / scale_factor
-            
-            # Garantir une épaisseur minimale pour la visibilité
-            adjusted_width = max(adjusted_width, 0.5)
+        # Même granularité que la clé de modified_svg_cache : un zoom continu réutilise le résultat
+        key = (state, int(round(scale_factor * 1000)))
+        cached = self._scaled_style_cache.get(key)
+        if cached is None:
+            cached = self.pipe_styles.get(state, self.pipe_styles['normal']).copy()
 
-            base_style['stroke-width'] = f"{adjusted_width:.2f}"
-            
-            print(f"📏 Ajustement stroke-width: {original_width} → {adjusted_width:.2f} (échelle: {scale_factor:.3f})")
-        
-        return base_style
+            # Ajuster stroke-width selon l'échelle
+            if 'stroke-width' in cached:
+                cached['stroke-width'] = self._scaled_stroke_width(state, scale_factor)
+
+            self._scaled_style_cache[key] = cached
+
+        return cached.copy()
+
+    def _scaled_stroke_width(self, state: str, scale_factor: float) -> Optional[str]:
+        """Épaisseur des tuyaux (chaîne SVG) pour un état et une échelle, None si non définie"""
+        base_width = self.pipe_styles.get(state, self.pipe_styles['normal']).get('stroke-width')
+        if base_width is None or scale_factor <= 0:
+            return base_width
+
+        adjusted_width = scaled_stroke_width(float(base_width), scale_factor)
+
+        # Chaîne réutilisée pour une même épaisseur au centième
+        key = int(round(adjusted_width * 100))
+        width_str = self._width_fmt_cache.get(key)
+        if width_str is None:
+            width_str = self._width_fmt_cache[key] = f"{key / 100:.2f}"
+        return width_str
+
+    def get_scaled_style_parts(self, state: str = 'normal', scale_factor: float = 1.0) -> Tuple[tuple, Optional[str]]:
+        """
+        Style des tuyaux en deux parties : les attributs fixes de l'état (précalculés)
+        et l'épaisseur, seule partie qui dépend de l'échelle
+        """
+        static_items = self._static_style_items.get(state)
+        if static_items is None:
+            static_items = self._static_style_items['normal']
+        return static_items, self._scaled_stroke_width(state, scale_factor)
     
     '''def calculate_optimal_stroke_width(self, base_width: float, scale_factor: float) -> float:
         """
@@ -194,37 +438,54 @@ class PipeStyleManager(QObject):
     
     def find_pipe_elements(self, root: ET.Element) -> List[ET.Element]:
         """Trouve tous les éléments avec ID du type 'Pipexxx'"""
+        if _PIPE_XPATH is not None and hasattr(root, 'xpath'):
+            # Arbre lxml : parcours en C
+            pipe_elements = _PIPE_XPATH(root)
+            if self._debug:
+                for element in pipe_elements:
+                    print(f"  🔗 Élément pipe trouvé: {element.get('id')} ({element.tag})")
+            return pipe_elements
+
         pipe_elements = []
         
         # Recherche récursive dans tout l'arbre XML
         for element in root.iter():
-            element_id = element.get('id', '')
+            element_id = element.get('id')
+            if not element_id:
+                continue
             
-            # Vérifier si l'ID correspond au pattern Pipexxx
-            if re.match(r'[Pp]ipe\d*', element_id, re.IGNORECASE):
+            # Vérifier si l'ID correspond au pattern Pipexxx (Pipe, Pipe1, pipe2... : préfixe "pipe",
+            # sans tenir compte de la casse)
+            if element_id[:4].lower() == 'pipe':
                 pipe_elements.append(element)
-                print(f"  🔗 Élément pipe trouvé: {element_id} ({element.tag})")
+                if self._debug:
+                    print(f"  🔗 Élément pipe trouvé: {element_id} ({element.tag})")
         
         return pipe_elements
     
     def apply_style_to_element(self, element: ET.Element, style: Dict[str, str]):
         """Applique un style à un élément SVG"""
-        original_attrs = {}
-        
-        # Sauvegarder les attributs originaux (pour debug)
-        for attr in ['stroke', 'stroke-width', 'fill']:
-            if attr in element.attrib:
-                original_attrs[attr] = element.attrib[attr]
+        if self._debug:
+            # Sauvegarder les attributs originaux (pour debug)
+            original_attrs = {attr: element.attrib[attr]
+                              for attr in self._DEBUG_ATTRIBUTES if attr in element.attrib}
         
         # Appliquer les nouveaux styles
+        allowed = self._STYLE_ATTRIBUTE_SET
         for attr, value in style.items():
-            if attr in ['stroke', 'stroke-width', 'fill', 'stroke-linecap', 'stroke-linejoin']:
+            if attr in allowed:
                 element.set(attr, value)
         
-        print(f"    🎨 Styles appliqués à {element.get('id', 'unknown')}: {style}")
-        if original_attrs:
-            print(f"      (original: {original_attrs})")
+        if self._debug:
+            print(f"    🎨 Styles appliqués à {element.get('id', 'unknown')}: {style}")
+            if original_attrs:
+                print(f"      (original: {original_attrs})")
     
+    def apply_style_parts_to_element(self, element: ET.Element, static_items: tuple, stroke_width: Optional[str]):
+        """Applique un style précalculé (voir get_scaled_style_parts) à un élément SVG"""
+        for attr, value in static_items:
+            element.set(attr, stroke_width if value is None else value)
+
     #MAB: méthode intuilisée
     '''def sync_with_polyline_styles(self, polyline_item):
         """Synchronise avec les styles d'une polyligne existante"""
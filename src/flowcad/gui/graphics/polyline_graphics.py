@@ -5,13 +5,18 @@
 Classes graphiques pour représenter les polylignes de connexion sur le canvas
 """
 
-from PyQt5.QtWidgets import QGraphicsPathItem, QGraphicsEllipseItem
-from PyQt5.QtCore import QPointF, Qt
-from PyQt5.QtGui import QPainterPath, QPen, QColor, QBrush
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsPathItem, QGraphicsEllipseItem
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5.QtGui import QPainter, QPainterPath, QPainterPathStroker, QPen, QColor, QBrush, QPixmap, QPolygonF
+from functools import lru_cache
+from types import MappingProxyType
 from typing import List, Optional
 from enum import Enum
+import weakref
 
-from .equipment_graphics import PortGraphicsItem, PortConnectionStatus
+import numpy as np
+
+from .equipment_graphics import PortGraphicsItem, PortConnectionStatus, schedule_scene_update
 from .pipe_style_manager import pipe_style_manager
 
 
@@ -20,134 +25,297 @@ from .pipe_style_manager import pipe_style_manager
     VERTICAL = "vertical" 
     DIAGONAL = "diagonal"'''
 
+# Traces de debug (désactivées : la plupart sont émises à chaque mouvement de souris)
+DEBUG = False
+
+# Couleur et épaisseur du trait par état, lues une fois dans pipe_style_manager et partagées
+# par toutes les polylignes (relues après un changement des styles globaux, voir
+# PolylineGraphicsItem._refresh_pen_states)
+@lru_cache(maxsize=None)
+def _pen_states() -> dict:
+    pen_states = {}
+    for state in ('normal', 'selected', 'hover'):
+        style = pipe_style_manager.get_pipe_style(state)
+        pen_states[state] = (QColor(style['stroke']), float(style['stroke-width']))
+    return pen_states
+
+pipe_style_manager.styles_changed.connect(_pen_states.cache_clear)
+
+# Au-delà de ce nombre de sommets, pas de cache pixmap (image trop grande / trop souvent refaite)
+CACHE_MAX_POINTS = 200
+
+# Marge de sélection autour du trait (px), de chaque côté : on attrape un tuyau "près" du trait
+PICK_MARGIN = 2.0
+
+# Déplacement (px, en x ou en y) au-delà duquel une extrémité est considérée comme déplacée
+MOVE_THRESHOLD = 1.0
+
+def _moved(dx, dy, threshold: float = MOVE_THRESHOLD):
+    """Vrai si le déplacement (dx, dy) dépasse threshold en x ou en y (flottants ou tableaux NumPy)"""
+    return (abs(dx) > threshold) | (abs(dy) > threshold)
+
+# Contour de sélection, un par trait (épaisseur, extrémités, jointures). Mêmes extrémités et
+# jointures que le stylo : boundingRect() est déduit de shape(), le contour doit donc couvrir
+# tout le trait dessiné (sinon les extrémités sont coupées, notamment par le cache pixmap)
+@lru_cache(maxsize=None)
+def _pick_stroker(width: float, cap_style: Qt.PenCapStyle, join_style: Qt.PenJoinStyle) -> QPainterPathStroker:
+    stroker = QPainterPathStroker()
+    stroker.setWidth(width + 2 * PICK_MARGIN)
+    stroker.setCapStyle(cap_style)
+    stroker.setJoinStyle(join_style)
+    return stroker
+
 # =============================================================================
 # CLASSE PRINCIPALE POUR UNE POLYLIGNE GRAPHIQUE
 # =============================================================================
 
 class PolylineGraphicsItem(QGraphicsPathItem):
     """Élément graphique représentant une polyligne de connexion"""
+
+    # Stylo de travail commun : modifié puis copié par setPen (voir set_pen_state)
+    _PEN = QPen()
+
+    # Polylignes vivantes, dont le trait est réappliqué quand les styles globaux changent
+    _instances = weakref.WeakSet()
+
+    # Définition par défaut d'un tuyau (lecture seule, copiée dans pipe_def à la création).
+    # Valeurs numériques, comme celles saisies dans le panneau de connexion et effacées par clear_results
+    DEFAULT_PROPERTIES = MappingProxyType({
+        "length_m": 10.0,
+        "diameter_m": 0.2,
+        "roughness_mm": 0.1
+    })
+    DEFAULT_RESULTS = MappingProxyType({
+        "flow_rate": 0.0,
+        "headloss": 0.0,
+        "velocity": 0.0,
+        "pressure_1": 0.0,
+        "head_1": 0.0,
+        "pressure_2": 0.0,
+        "head_2": 0.0,
+        "total_headloss": 0.0
+    })
     
-    def __init__(self, points: List[QPointF], start_port=None, end_port=None, pipe_id = None):
+    def __init__(self, points: List[QPointF], start_port=None, end_port=None, pipe_id = None, register=True):
         super().__init__()
         
         self.pipe_id = pipe_id  # Identifiant unique de la polyligne
         self.pipe_def = {}  # Définition de la polyligne (à compléter plus tard)
-        self.points = points.copy()
+        # Sommets stockés en deux listes de flottants _xs / _ys (voir la propriété points).
+        # La polyligne reste à l'origine de la scène, sans transformation (elle n'est pas déplaçable) :
+        # ses coordonnées locales sont des coordonnées de scène, aucun mapToScene n'est nécessaire.
+        self.points = points
         self.start_port = start_port
         self.end_port = end_port
-        self.control_points: List[PolylineControlPoint] = []
 
-        #liaison avec l'équipement existant
-        self.register_with_connected_equipment()
+        # Dernières positions scène connues des ports d'extrémité (None : à relire)
+        self._cached_start_pos: Optional[QPointF] = None
+        self._cached_end_pos: Optional[QPointF] = None
 
-        #va chercher les valeurs par défaut de pipe_style_manager       
-        normal_style = pipe_style_manager.get_pipe_style('normal')
-        selected_style = pipe_style_manager.get_pipe_style('selected') 
-        hover_style = pipe_style_manager.get_pipe_style('hover')
-        
-        # Style de la polyligne
-        self.normal_pen = QPen(QColor(normal_style['stroke']), float(normal_style['stroke-width']))
-        self.selected_pen = QPen(QColor(selected_style['stroke']), float(selected_style['stroke-width']))
-        self.hover_pen = QPen(QColor(hover_style['stroke']), float(hover_style['stroke-width']))
+        # Dernière zone de repaint demandée par _apply_endpoint_moves (pas de doublon)
+        self._last_update_rect: Optional[QRectF] = None
+        # Forme (contour du trait) mémorisée, recalculée seulement si le chemin ou l'épaisseur change
+        self._cached_shape: Optional[QPainterPath] = None
+
+        #liaison avec l'équipement existant (register=False : voir bulk_register, pour les chargements)
+        if register:
+            self.register_with_connected_equipment()
+
+        #styles de pipe_style_manager : couleur et épaisseur par état, lues dans _pen_states()
+        self._pen_state = None  # État de trait appliqué (setPen évité s'il ne change pas)
+        PolylineGraphicsItem._instances.add(self)
         
         # Configuration
         self.setFlag(QGraphicsPathItem.ItemIsSelectable, True)
         self.setAcceptHoverEvents(True)
         self.setZValue(-1)  # Au-dessus de la grille, sous les équipements
+        # Région de mise à jour = rectangle englobant (pas de découpage fin à chaque repaint)
+        self.setBoundingRegionGranularity(0.0)
         
+        # Points de contrôle (cachés initialement) : un seul élément enfant pour tous les points
+        self.control_points_item = ControlPointGroupItem(self)
+
         # Créer le chemin initial
         self.update_path()
-        self.setPen(self.normal_pen)
-        
-        # Créer les points de contrôle (cachés initialement)
-        self.create_control_points()
-
-        self.pipe_def["properties"] = {
-            "length_m": "10",
-            "diameter_m": "0.2",
-            "roughness_mm": "0.1"
-        }
-        self.pipe_def["results"] = {
-            "flow_rate": "0.0",
-            "headloss": "0.0",
-            "velocity": "0.0",
-            "pressure_1": "0.0",
-            "head_1": "0.0",
-            "pressure_2": "0.0",
-            "head_2": "0.0",
-            "total_headloss": "0.0"
-        }
+        self.set_pen_state('normal')
+
+        self.pipe_def["properties"] = dict(self.DEFAULT_PROPERTIES)
+        self.pipe_def["results"] = dict(self.DEFAULT_RESULTS)
+
+    @property
+    def points(self) -> List[QPointF]:
+        """Sommets de la polyligne (copie en QPointF : la modifier ne change pas la polyligne)"""
+        return [QPointF(x, y) for x, y in zip(self._xs, self._ys)]
+
+    @points.setter
+    def points(self, points: List[QPointF]):
+        self._xs = [point.x() for point in points]
+        self._ys = [point.y() for point in points]
+        self._path = None  # Chemin à reconstruire entièrement (voir update_path)
+
+    def point_count(self) -> int:
+        """Nombre de sommets (sans construire la liste de QPointF)"""
+        return len(self._xs)
+
+    def _build_path(self) -> QPainterPath:
+        """
+        Construit le chemin à partir des coordonnées flottantes : les sommets sont copiés en bloc
+        dans la mémoire d'un QPolygonF (vue NumPy), puis ajoutés par un seul addPolygon
+        (même structure qu'un moveTo suivi de lineTo : un élément par sommet)
+        """
+        n = len(self._xs)
+        polygon = QPolygonF(n)
+        buffer = polygon.data()
+        buffer.setsize(n * 2 * 8)  # n points de deux qreal (double)
+        coords = np.frombuffer(buffer, dtype=np.float64).reshape(n, 2)
+        coords[:, 0] = self._xs
+        coords[:, 1] = self._ys
+
+        path = QPainterPath()
+        path.addPolygon(polygon)
+        return path
 
     def update_path(self):
         """Met à jour le chemin graphique à partir des points"""
-        if len(self.points) < 2:
+        if len(self._xs) < 2:
             return
         
-        # Invalider l'ancienne zone avant modification
-        if self.scene():
-            old_rect = self.mapRectToScene(self.boundingRect())
-            old_rect = old_rect.adjusted(-5, -5, 5, 5)  # Petite marge
-            self.scene().update(old_rect)
+        # setPath prévient la scène (prepareGeometryChange) et fait redessiner l'ancienne et la nouvelle zone
+        self._path = self._build_path()
+        self._update_cache_mode()
+        self._set_path(self._path)
+        self._sync_control_points()
 
-        path = QPainterPath()
-        path.moveTo(self.points[0])
-        
-        for i in range(1, len(self.points)):
-            path.lineTo(self.points[i])
-        
+    def _update_cache_mode(self):
+        """
+        Cache pixmap en coordonnées écran : pan et survol d'autres éléments redessinent la
+        polyligne par une simple copie d'image. setPath / setPen appellent update(), ce qui
+        invalide le cache à chaque modification du trait.
+        """
+        mode = (QGraphicsItem.DeviceCoordinateCache if len(self._xs) <= CACHE_MAX_POINTS
+                else QGraphicsItem.NoCache)
+        if self.cacheMode() != mode:
+            self.setCacheMode(mode)
+
+    def _set_path(self, path: QPainterPath):
+        """setPath en invalidant la forme mémorisée"""
+        self._cached_shape = None
         self.setPath(path)
 
-        # Invalider la nouvelle zone après modification
-        if self.scene():
-            new_rect = self.mapRectToScene(self.boundingRect())
-            new_rect = new_rect.adjusted(-5, -5, 5, 5)  # Petite marge
-            self.scene().update(new_rect)
-    
-    def create_control_points(self):
-        """Crée les points de contrôle pour l'édition"""
-        # Nettoyer les anciens points de contrôle
-        for cp in self.control_points:
-            if cp.scene():
-                cp.scene().removeItem(cp)
-        self.control_points.clear()
-        
-        # Créer les nouveaux points de contrôle (sauf premier et dernier)
-        for i in range(1, len(self.points) - 1):
-            control_point = PolylineControlPoint(i, self)
-            control_point.setPos(self.points[i])
-            control_point.setParentItem(self)
-            self.control_points.append(control_point)
+    def shape(self) -> QPainterPath:
+        """
+        Forme pour la sélection et le survol, mémorisée (calcul du contour du trait coûteux) :
+        contour du chemin, un peu plus large que le trait pour faciliter le clic
+        """
+        if self._cached_shape is None:
+            pen = self.pen()
+            stroker = _pick_stroker(pen.widthF(), pen.capStyle(), pen.joinStyle())
+            self._cached_shape = stroker.createStroke(self.path())
+        return self._cached_shape
+
+    def _segments_scene_rect(self, index: int) -> QRectF:
+        """Zone scène des deux segments qui touchent le sommet index (avec une petite marge)"""
+        first = max(index - 1, 0)
+        xs = self._xs[first:index + 2]
+        ys = self._ys[first:index + 2]
+        rect = QRectF(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+        return rect.adjusted(-5, -5, 5, 5)  # Coordonnées locales = scène
+
+    def _move_vertex(self, index: int, x: float, y: float):
+        """
+        Déplace un sommet en modifiant le chemin en place (setElementPositionAt) : seule la zone
+        des deux segments concernés est redessinée. Les changements de structure (ajout ou
+        suppression de sommets) passent par update_path.
+        """
+        path = self._path
+        if path is None or path.elementCount() != len(self._xs):
+            self._xs[index] = x
+            self._ys[index] = y
+            self.update_path()
+            return
+
+        old_rect = self._segments_scene_rect(index)
+        self._xs[index] = x
+        self._ys[index] = y
+        path.setElementPositionAt(index, x, y)
+        self._set_path(path)
+
+        # Point intermédiaire déplacé hors drag (pendant un drag, la poignée le dessine)
+        if 0 < index < len(self._xs) - 1 and index != self.control_points_item.dragged_index():
+            self._sync_control_points()
+
+        schedule_scene_update(self.scene(), old_rect.united(self._segments_scene_rect(index)))
+
+    def set_point(self, index: int, new_pos: QPointF):
+        """Déplace un seul point (drag d'un point de contrôle)"""
+        if len(self._xs) < 2:
+            self._xs[index] = new_pos.x()
+            self._ys[index] = new_pos.y()
+            return
+        self._move_vertex(index, new_pos.x(), new_pos.y())
     
+    def _sync_control_points(self):
+        """
+        Aligne les points de contrôle sur les sommets (sauf premier et dernier point) : ils sont
+        tous dessinés par un seul élément (ControlPointGroupItem), qui est simplement recalculé
+        """
+        self.control_points_item.refresh()
+
     def add_point(self, point: QPointF):
         """Ajoute un point à la polyligne"""
-        self.points.append(point)
+        self._xs.append(point.x())
+        self._ys.append(point.y())
         self.update_path()
-        self.create_control_points()
     
     def insert_point(self, index: int, point: QPointF):
         """Insère un point à une position donnée"""
-        if 0 <= index <= len(self.points):
-            self.points.insert(index, point)
+        if 0 <= index <= len(self._xs):
+            self._xs.insert(index, point.x())
+            self._ys.insert(index, point.y())
             self.update_path()
-            self.create_control_points()
     
     def remove_point(self, index: int):
         """Supprime un point (sauf premier et dernier)"""
-        if 1 <= index < len(self.points) - 1:
-            self.points.pop(index)
+        if 1 <= index < len(self._xs) - 1:
+            self._xs.pop(index)
+            self._ys.pop(index)
             self.update_path()
-            self.create_control_points()
     
     def set_last_point(self, point: QPointF):
-        """Modifie le dernier point (pour la prévisualisation)"""
-        if len(self.points) > 0:
-            self.points[-1] = point
-            self.update_path()
+        """
+        Modifie le dernier point (pour la prévisualisation, à chaque mouvement de souris) :
+        le dernier élément du chemin est déplacé en place, sans reconstruire le chemin
+        """
+        if len(self._xs) > 1:
+            self._move_vertex(len(self._xs) - 1, point.x(), point.y())
+        elif self._xs:
+            self._xs[-1] = point.x()
+            self._ys[-1] = point.y()
     
+    def set_pen_state(self, state: str):
+        """Applique le style de trait d'un état ('normal', 'selected', 'hover')"""
+        if state == self._pen_state:
+            return  # setPen déclencherait un update() inutile
+        self._pen_state = state
+        color, width = _pen_states()[state]
+        if self.pen().widthF() != width:
+            self._cached_shape = None  # Le contour dépend de l'épaisseur
+        pen = self._PEN
+        pen.setColor(color)
+        pen.setWidthF(width)
+        self.setPen(pen)
+
+    @classmethod
+    def _refresh_pen_states(cls):
+        """Réapplique le trait de chaque polyligne vivante après un changement des styles globaux"""
+        for polyline in list(cls._instances):
+            state = polyline._pen_state or 'normal'
+            polyline._pen_state = None  # Forcer setPen malgré un état inchangé
+            polyline.set_pen_state(state)
+
     def show_control_points(self, show=True):
         """Affiche ou cache les points de contrôle"""
-        for cp in self.control_points:
-            cp.setVisible(show)
+        self.control_points_item.setVisible(show)
     
     def get_port_connections(self):
         """Retourne les ports connectés par cette polyligne"""
@@ -166,15 +334,14 @@ class PolylineGraphicsItem(QGraphicsPathItem):
     
     def hoverEnterEvent(self, event):
         """Survol de la polyligne"""
-        self.setPen(self.hover_pen)
+        self.set_pen_state('hover')
         # Afficher les points de contrôle au survol
         self.show_control_points(True)
         super().hoverEnterEvent(event)
     
     def hoverLeaveEvent(self, event):
         """Fin de survol"""
-        pen = self.selected_pen if self.isSelected() else self.normal_pen
-        self.setPen(pen)
+        self.set_pen_state('selected' if self.isSelected() else 'normal')
         # Cacher les points de contrôle si pas sélectionné
         if not self.isSelected():
             self.show_control_points(False)
@@ -183,8 +350,7 @@ class PolylineGraphicsItem(QGraphicsPathItem):
     def itemChange(self, change, value):
         """Changement d'état de l'item"""
         if change == QGraphicsPathItem.ItemSelectedChange:
-            pen = self.selected_pen if value else self.normal_pen
-            self.setPen(pen)
+            self.set_pen_state('selected' if value else 'normal')
             # Afficher les points de contrôle si sélectionné
             self.show_control_points(value)
         return super().itemChange(change, value)
@@ -192,142 +358,225 @@ class PolylineGraphicsItem(QGraphicsPathItem):
     def mousePressEvent(self, event):
         """Clic sur la polyligne"""
         if event.button() == Qt.LeftButton:
-            print(f"🔗 Polyligne sélectionnée")
+            if DEBUG:
+                print(f"🔗 Polyligne sélectionnée")
         super().mousePressEvent(event)
 
+    def connected_equipments(self):
+        """Équipements reliés par cette polyligne (chacun une seule fois)"""
+        equipments = []
+        for port in (self.start_port, self.end_port):
+            equipment = port.parent_equipment if port else None
+            if equipment is not None and equipment not in equipments:
+                equipments.append(equipment)
+        return equipments
+
+    def _register(self, add: bool):
+        """Inscrit (add=True) ou désinscrit la polyligne auprès de ses équipements, en un passage"""
+        for equipment in self.connected_equipments():
+            if add:
+                equipment.add_connected_polyline(self)
+            else:
+                equipment.remove_connected_polyline(self)
+
     def register_with_connected_equipment(self):
         """S'enregistre auprès des équipements connectés pour recevoir les notifications"""
-        if self.start_port and self.start_port.parent_equipment:
-            self.start_port.parent_equipment.add_connected_polyline(self)
-        
-        if self.end_port and self.end_port.parent_equipment:
-            self.end_port.parent_equipment.add_connected_polyline(self)
-        
-        print(f"🔗 Polyligne enregistrée auprès des équipements connectés")
+        self._register(True)
+        if DEBUG:
+            print(f"🔗 Polyligne enregistrée auprès des équipements connectés")
     
     def unregister_from_connected_equipment(self):
         """Se désenregistre des équipements connectés"""
-        if self.start_port and self.start_port.parent_equipment:
-            self.start_port.parent_equipment.remove_connected_polyline(self)
-        
-        if self.end_port and self.end_port.parent_equipment:
-            self.end_port.parent_equipment.remove_connected_polyline(self)
-        
-        print(f"🔗 Polyligne désenregistrée des équipements connectés")
+        self._register(False)
+        if DEBUG:
+            print(f"🔗 Polyligne désenregistrée des équipements connectés")
+
+    @classmethod
+    def bulk_register(cls, polylines):
+        """
+        Enregistre d'un coup des polylignes créées avec register=False (chargement d'un projet) :
+        elles sont regroupées par équipement, qui ne reçoit qu'un appel
+        """
+        by_equipment = {}
+        for polyline in polylines:
+            for equipment in polyline.connected_equipments():
+                by_equipment.setdefault(equipment, []).append(polyline)
+        for equipment, equipment_polylines in by_equipment.items():
+            equipment.add_connected_polylines(equipment_polylines)
     
-    def update_connection_points(self):
-        """Met à jour les points en maintenant l'alignement orthogonal"""
+    def invalidate_port_positions(self):
+        """Oublie les positions mémorisées des ports (équipement tourné, retourné...)"""
+        self._cached_start_pos = None
+        self._cached_end_pos = None
+
+    def _refresh_port_positions(self, moved_equipment=None):
+        """
+        Relit dans la scène la position des ports qui ont pu bouger (scenePos remonte toute
+        la chaîne des parents) ; les autres gardent leur position mémorisée
+        """
+        if (self._cached_start_pos is None or moved_equipment is None
+                or self.start_port.parent_equipment is moved_equipment):
+            self._cached_start_pos = self.start_port.scenePos()
+        if (self._cached_end_pos is None or moved_equipment is None
+                or self.end_port.parent_equipment is moved_equipment):
+            self._cached_end_pos = self.end_port.scenePos()
+        return self._cached_start_pos, self._cached_end_pos
+
+    def update_connection_points(self, moved_equipment=None):
+        """
+        Met à jour les points en maintenant l'alignement orthogonal
+
+        Args:
+            moved_equipment: équipement déplacé ; seul son port est relu dans la scène,
+                             l'autre extrémité reprend sa position mémorisée (None : tout relire)
+        """
         if not self.start_port or not self.end_port:
             print("⚠️ Impossible de mettre à jour : ports manquants")
             return
-        
-        # Sauvegarder l'ancienne zone avant modification
-        old_bounding_rect = self.boundingRect()
-        old_scene_rect = self.mapRectToScene(old_bounding_rect)
 
         # Obtenir les nouvelles positions des ports
-        new_start_pos = self.start_port.scenePos()
-        new_end_pos = self.end_port.scenePos()
+        new_start_pos, new_end_pos = self._refresh_port_positions(moved_equipment)
         
         # Vérifier quel port a bougé
-        old_start_pos = self.points[0]
-        old_end_pos = self.points[-1]
-        
-        start_moved = self.has_moved_significantly(old_start_pos, new_start_pos)
-        end_moved = self.has_moved_significantly(old_end_pos, new_end_pos)
+        xs, ys = self._xs, self._ys
+        start_moved = _moved(new_start_pos.x() - xs[0], new_start_pos.y() - ys[0])
+        end_moved = _moved(new_end_pos.x() - xs[-1], new_end_pos.y() - ys[-1])
         
         if not start_moved and not end_moved:
             return
+
+        self._apply_endpoint_moves(start_moved, end_moved)
+
+    @classmethod
+    def update_all(cls, polylines, moved_equipment=None):
+        """
+        Met à jour en un seul passage les polylignes reliées à un équipement déplacé : les
+        extrémités (anciennes et nouvelles) sont comparées en une opération NumPy, seules les
+        polylignes dont une extrémité a bougé de plus d'un pixel sont retouchées
+        """
+        linked = []
+        for polyline in polylines:
+            if polyline.start_port and polyline.end_port:
+                linked.append(polyline)
+            else:
+                polyline.update_connection_points(moved_equipment)  # Signale les ports manquants
+        if not linked:
+            return
+
+        old = np.array([(p._xs[0], p._ys[0], p._xs[-1], p._ys[-1]) for p in linked])
+        new = np.empty_like(old)
+        for i, polyline in enumerate(linked):
+            start_pos, end_pos = polyline._refresh_port_positions(moved_equipment)
+            new[i] = (start_pos.x(), start_pos.y(), end_pos.x(), end_pos.y())
+
+        # Même règle que update_connection_points, appliquée aux deux extrémités de toutes les polylignes
+        delta = new - old
+        start_moved = _moved(delta[:, 0], delta[:, 1])
+        end_moved = _moved(delta[:, 2], delta[:, 3])
+        for i in np.flatnonzero(start_moved | end_moved):
+            linked[i]._apply_endpoint_moves(bool(start_moved[i]), bool(end_moved[i]))
+
+    def _apply_endpoint_moves(self, start_moved: bool, end_moved: bool):
+        """Reporte le déplacement des ports (positions mémorisées) sur la polyligne et la redessine"""
+        # Sauvegarder l'ancienne zone avant modification (coordonnées locales = scène)
+        old_scene_rect = self.boundingRect()
         
-        print(f"🔄 Mise à jour polyligne: start_moved={start_moved}, end_moved={end_moved}")
+        if DEBUG:
+            print(f"🔄 Mise à jour polyligne: start_moved={start_moved}, end_moved={end_moved}")
         
         # Mettre à jour les points concernés
         if start_moved:
-            self.update_start_point_and_adjacent(new_start_pos)
+            self.update_start_point_and_adjacent(self._cached_start_pos)
         
         if end_moved:
-            self.update_end_point_and_adjacent(new_end_pos)
+            self.update_end_point_and_adjacent(self._cached_end_pos)
         
-        # Redessiner
+        # Redessiner (chemin et points de contrôle)
         self.update_path()
-        self.update_control_points_positions()
 
         # Invalider l'ancienne ET la nouvelle zone
-        new_bounding_rect = self.boundingRect()
-        new_scene_rect = self.mapRectToScene(new_bounding_rect)
+        new_scene_rect = self.boundingRect()
         
         # Combiner les deux zones avec une marge de sécurité
         combined_rect = old_scene_rect.united(new_scene_rect)
         margin = 10  # Marge de sécurité
         combined_rect = combined_rect.adjusted(-margin, -margin, margin, margin)
         
-        # Forcer le repaint de cette zone
-        if self.scene():
-            self.scene().update(combined_rect)
-            print(f"🎨 Zone repaint: {combined_rect.width():.0f}x{combined_rect.height():.0f}")
+        # Repaint de cette zone, regroupé avec les autres changements du même tour de boucle
+        # (inutile si c'est exactement la zone déjà demandée au dernier appel)
+        if self.scene() and combined_rect != self._last_update_rect:
+            self._last_update_rect = combined_rect
+            schedule_scene_update(self.scene(), combined_rect)
+            if DEBUG:
+                print(f"🎨 Zone repaint: {combined_rect.width():.0f}x{combined_rect.height():.0f}")
 
-
-    def has_moved_significantly(self, old_pos, new_pos, threshold=1.0):
-        """Vérifie si un point a bougé de manière significative"""
-        dx = abs(new_pos.x() - old_pos.x())
-        dy = abs(new_pos.y() - old_pos.y())
-        return dx > threshold or dy > threshold
+    def has_moved_significantly(self, old_pos, new_pos, threshold=MOVE_THRESHOLD):
+        """Vérifie si un point a bougé de manière significative (plus de threshold en x ou en y)"""
+        return _moved(new_pos.x() - old_pos.x(), new_pos.y() - old_pos.y(), threshold)
     
     def update_start_point_and_adjacent(self, new_start_pos):
         """Met à jour le point de départ et son point adjacent"""
         
         # Mettre à jour le point de départ
-        old_start = self.points[0]
-        self.points[0] = new_start_pos
+        xs, ys = self._xs, self._ys
+        old_x, old_y = xs[0], ys[0]
+        new_x, new_y = new_start_pos.x(), new_start_pos.y()
+        xs[0] = new_x
+        ys[0] = new_y
         
         # S'il y a un point adjacent (index 1)
-        if len(self.points) >= 2:
-            adjacent_point = self.points[1]
-            
+        if len(xs) >= 2:
             # Déterminer quelle coordonnée était alignée avec l'ancien port
-            same_x = abs(adjacent_point.x() - old_start.x()) < 1.0
-            same_y = abs(adjacent_point.y() - old_start.y()) < 1.0
+            same_x = abs(xs[1] - old_x) < 1.0
+            same_y = abs(ys[1] - old_y) < 1.0
             
             if same_x:
                 # Le point était aligné horizontalement → maintenir X identique
-                self.points[1] = QPointF(new_start_pos.x(), adjacent_point.y())
-                print(f"📐 Point adjacent au start: alignement X maintenu ({new_start_pos.x():.1f})")
+                xs[1] = new_x
+                if DEBUG:
+                    print(f"📐 Point adjacent au start: alignement X maintenu ({new_x:.1f})")
                 
             elif same_y:
                 # Le point était aligné verticalement → maintenir Y identique  
-                self.points[1] = QPointF(adjacent_point.x(), new_start_pos.y())
-                print(f"📐 Point adjacent au start: alignement Y maintenu ({new_start_pos.y():.1f})")
+                ys[1] = new_y
+                if DEBUG:
+                    print(f"📐 Point adjacent au start: alignement Y maintenu ({new_y:.1f})")
                 
             else:
-                print(f"⚠️ Point adjacent au start: pas d'alignement détecté")
+                if DEBUG:
+                    print(f"⚠️ Point adjacent au start: pas d'alignement détecté")
 
     def update_end_point_and_adjacent(self, new_end_pos):
         """Met à jour le point de fin et son point adjacent"""
         
         # Mettre à jour le point de fin
-        old_end = self.points[-1]
-        self.points[-1] = new_end_pos
+        xs, ys = self._xs, self._ys
+        old_x, old_y = xs[-1], ys[-1]
+        new_x, new_y = new_end_pos.x(), new_end_pos.y()
+        xs[-1] = new_x
+        ys[-1] = new_y
         
         # S'il y a un point adjacent (avant-dernier)
-        if len(self.points) >= 2:
-            adjacent_point = self.points[-2]
-            
+        if len(xs) >= 2:
             # Déterminer quelle coordonnée était alignée avec l'ancien port
-            same_x = abs(adjacent_point.x() - old_end.x()) < 1.0
-            same_y = abs(adjacent_point.y() - old_end.y()) < 1.0
+            same_x = abs(xs[-2] - old_x) < 1.0
+            same_y = abs(ys[-2] - old_y) < 1.0
             
             if same_x:
                 # Le point était aligné horizontalement → maintenir X identique
-                self.points[-2] = QPointF(new_end_pos.x(), adjacent_point.y())
-                print(f"📐 Point adjacent au end: alignement X maintenu ({new_end_pos.x():.1f})")
+                xs[-2] = new_x
+                if DEBUG:
+                    print(f"📐 Point adjacent au end: alignement X maintenu ({new_x:.1f})")
                 
             elif same_y:
                 # Le point était aligné verticalement → maintenir Y identique
-                self.points[-2] = QPointF(adjacent_point.x(), new_end_pos.y())
-                print(f"📐 Point adjacent au end: alignement Y maintenu ({new_end_pos.y():.1f})")
+                ys[-2] = new_y
+                if DEBUG:
+                    print(f"📐 Point adjacent au end: alignement Y maintenu ({new_y:.1f})")
                 
             else:
-                print(f"⚠️ Point adjacent au end: pas d'alignement détecté")
+                if DEBUG:
+                    print(f"⚠️ Point adjacent au end: pas d'alignement détecté")
 
     '''def debug_point_alignment(self):
         """Debug pour vérifier les alignements"""
@@ -482,21 +731,16 @@ class PolylineGraphicsItem(QGraphicsPathItem):
         
         print(f"  ⚠️ Ajustement depuis la fin : algorithme simple utilisé")'''
     
-    def update_control_points_positions(self):
-        """Met à jour les positions des points de contrôle"""
-        for i, control_point in enumerate(self.control_points):
-            if i + 1 < len(self.points):  # Points intermédiaires seulement
-                control_point.setPos(self.points[i + 1])
-    
     def destroy(self):
         """Nettoie la polyligne avant destruction"""
         self.unregister_from_connected_equipment()
+        PolylineGraphicsItem._instances.discard(self)
         
-        # Nettoyer les points de contrôle
-        for cp in self.control_points:
-            if cp.scene():
-                cp.scene().removeItem(cp)
-        self.control_points.clear()
+        # Nettoyer les points de contrôle (et une éventuelle poignée de déplacement)
+        control_points_item = self.control_points_item
+        control_points_item.end_drag()
+        if control_points_item.scene():
+            control_points_item.scene().removeItem(control_points_item)
 
     def update_properties(self, new_def: dict):
         """Met à jour les propriétés de l'équipement"""
@@ -611,27 +855,33 @@ class PolylineGraphicsItem(QGraphicsPathItem):
     optimized.append(points[-1])
     return optimized'''
 
+# Connecté après _pen_states.cache_clear : les traits sont réappliqués avec les nouveaux styles
+pipe_style_manager.styles_changed.connect(PolylineGraphicsItem._refresh_pen_states)
+
 # =============================================================================
 # CLASSE POUR LES POINTS DE CONTRÔLE
 # =============================================================================
 
 class PolylineControlPoint(QGraphicsEllipseItem):
     """Point de contrôle pour modifier une polyligne"""
+
+    # Style, commun à tous les points de contrôle
+    normal_brush = QBrush(QColor(255, 255, 255))
+    hover_brush = QBrush(QColor(255, 255, 0))
+    selected_brush = QBrush(QColor(255, 140, 0))
+    border_pen = QPen(QColor(70, 130, 180), 2)
     
-    def __init__(self, point_index: int, polyline_item: PolylineGraphicsItem):
-        super().__init__(-4, -4, 8, 8)  # Petit cercle de 8px de diamètre
+    def __init__(self, point_index: int, polyline_item: PolylineGraphicsItem, parent=None):
+        # Petit cercle de 8px de diamètre ; parent donné à la construction (pas de reparentage ensuite)
+        super().__init__(-4, -4, 8, 8, parent)
         
         self.point_index = point_index
         self.polyline_item = polyline_item
         self.is_dragging = False
         
-        # Style
-        self.normal_brush = QBrush(QColor(255, 255, 255))
-        self.hover_brush = QBrush(QColor(255, 255, 0))
-        self.selected_brush = QBrush(QColor(255, 140, 0))
-        
+        self._current_brush = self.normal_brush
         self.setBrush(self.normal_brush)
-        self.setPen(QPen(QColor(70, 130, 180), 2))
+        self.setPen(self.border_pen)
         
         # Configuration
         self.setFlag(QGraphicsEllipseItem.ItemIsMovable, True)
@@ -647,86 +897,271 @@ class PolylineControlPoint(QGraphicsEllipseItem):
     
     def hoverEnterEvent(self, event):
         """Survol du point de contrôle"""
-        self.setBrush(self.hover_brush)
+        self._set_brush(self.hover_brush)
         super().hoverEnterEvent(event)
     
     def hoverLeaveEvent(self, event):
         """Fin de survol"""
-        brush = self.selected_brush if self.isSelected() else self.normal_brush
-        self.setBrush(brush)
+        self._set_brush(self.selected_brush if self.isSelected() else self.normal_brush)
         super().hoverLeaveEvent(event)
     
     def mousePressEvent(self, event):
         """Début du déplacement"""
         if event.button() == Qt.LeftButton:
-            self.is_dragging = True
-            self.setBrush(self.selected_brush)
-            print(f"📍 Début déplacement point {self.point_index}")
+            self.start_drag()
         super().mousePressEvent(event)
     
     def mouseMoveEvent(self, event):
         """Déplacement du point avec contraintes orthogonales"""
         if not self.is_dragging:
             return
-        
-        # Position actuelle de la souris en coordonnées de scène
-        scene_pos = event.scenePos()
-        
-        # Appliquer les contraintes orthogonales
-        constrained_pos = self.apply_orthogonal_constraints(scene_pos)
-        
-        # Mettre à jour la position du point de contrôle
-        parent_pos = self.parentItem().mapFromScene(constrained_pos) if self.parentItem() else constrained_pos
-        self.setPos(parent_pos)
-        
-        # Mettre à jour la polyligne
-        if 0 <= self.point_index < len(self.polyline_item.points):
-            self.polyline_item.points[self.point_index] = constrained_pos
-            self.polyline_item.update_path()
-        
+        self.drag_to(event.scenePos())
         # Pas besoin d'appeler super() car on gère le déplacement manuellement
     
     def mouseReleaseEvent(self, event):
         """Fin du déplacement"""
         if event.button() == Qt.LeftButton:
-            self.is_dragging = False
-            print(f"📍 Fin déplacement point {self.point_index}")
+            self.end_drag()
         super().mouseReleaseEvent(event)
+
+    def start_drag(self):
+        """Début du déplacement (clic sur le point, ou poignée créée par ControlPointGroupItem)"""
+        self.is_dragging = True
+        self._set_brush(self.selected_brush)
+        if DEBUG:
+            print(f"📍 Début déplacement point {self.point_index}")
+
+    def drag_to(self, scene_pos: QPointF):
+        """Déplace le point vers scene_pos avec contraintes orthogonales"""
+        # Position de la souris contrainte (coordonnées de scène, en flottants : pas de QPointF)
+        x, y = self.constrained_coords(scene_pos)
+        
+        # Mettre à jour la position du point de contrôle
+        # (parent : la polyligne, à l'origine de la scène, donc mêmes coordonnées)
+        self.setPos(x, y)
+        
+        # Mettre à jour la polyligne (sommet déplacé en place dans le chemin)
+        polyline = self.polyline_item
+        if 0 <= self.point_index < polyline.point_count():
+            polyline._move_vertex(self.point_index, x, y)
+
+    def end_drag(self):
+        """Fin du déplacement"""
+        self.is_dragging = False
+        if DEBUG:
+            print(f"📍 Fin déplacement point {self.point_index}")
     
     def apply_orthogonal_constraints(self, new_pos: QPointF) -> QPointF:
         """Applique les contraintes orthogonales lors du déplacement"""
-        
-        points = self.polyline_item.points
+        return QPointF(*self.constrained_coords(new_pos))
+
+    def constrained_coords(self, new_pos: QPointF):
+        """Coordonnées (x, y) de new_pos après contraintes orthogonales (appelé à chaque pixel de drag)"""
+        polyline = self.polyline_item
         index = self.point_index
+        nx, ny = new_pos.x(), new_pos.y()
         
-        if index <= 0 or index >= len(points) - 1:
-            return new_pos  # Pas de contraintes pour les points extrêmes
+        if index <= 0 or index >= len(polyline._xs) - 1:
+            return nx, ny  # Pas de contraintes pour les points extrêmes
         
-        # Points adjacent
-        prev_point = points[index - 1]
-        next_point = points[index + 1] if index + 1 < len(points) else None
+        # Coordonnées du point précédent
+        px, py = polyline._xs[index - 1], polyline._ys[index - 1]
+        dx = nx - px
+        dy = ny - py
         
-        # Calculer les distances à partir du point précédent
-        dx = abs(new_pos.x() - prev_point.x())
-        dy = abs(new_pos.y() - prev_point.y())
-        
-        # Mouvement dominant détermine la contrainte
-        if dx > dy:
+        # Mouvement dominant détermine la contrainte (carrés : pas besoin d'abs)
+        if dx * dx > dy * dy:
             # Mouvement horizontal : garder Y du point précédent
-            constrained_pos = QPointF(new_pos.x(), prev_point.y())
-        else:
-            # Mouvement vertical : garder X du point précédent
-            constrained_pos = QPointF(prev_point.x(), new_pos.y())
-        
-        return constrained_pos
+            return nx, py
+        # Mouvement vertical : garder X du point précédent
+        return px, ny
     
     def itemChange(self, change, value):
         """Changement d'état du point de contrôle"""
         if change == QGraphicsEllipseItem.ItemSelectedChange:
-            brush = self.selected_brush if value else self.normal_brush
-            self.setBrush(brush)
+            self._set_brush(self.selected_brush if value else self.normal_brush)
         return super().itemChange(change, value)
 
+    def _set_brush(self, brush: QBrush):
+        """setBrush seulement si le pinceau change (setBrush déclenche toujours un update())"""
+        if brush is not self._current_brush:
+            self._current_brush = brush
+            self.setBrush(brush)
+
+# =============================================================================
+# ÉLÉMENT UNIQUE POUR TOUS LES POINTS DE CONTRÔLE D'UNE POLYLIGNE
+# =============================================================================
+
+class ControlPointGroupItem(QGraphicsItem):
+    """
+    Points de contrôle d'une polyligne dessinés par un seul élément (un par polyligne au lieu
+    d'un par sommet dans la scène) : un disque, pixmap commune, par point intermédiaire.
+    Au clic sur un point, une poignée PolylineControlPoint est créée le temps du déplacement.
+    """
+
+    RADIUS = 4.0        # Rayon des disques (8px de diamètre, comme PolylineControlPoint)
+    PICK_RADIUS = 6.0   # Distance de prise d'un point à la souris
+    PIXMAP_SCALE = 4    # Pixmaps dessinées 4x plus grandes : nettes jusqu'à un zoom x4
+
+    # Pixmaps communes à toutes les polylignes, par couleur de remplissage (créées au premier dessin)
+    _pixmaps = {}
+
+    def __init__(self, polyline_item: PolylineGraphicsItem):
+        super().__init__(polyline_item)  # Enfant de la polyligne : mêmes coordonnées (scène)
+
+        self.polyline_item = polyline_item
+        self.hover_index: Optional[int] = None
+        self.drag_handle: Optional[PolylineControlPoint] = None
+        self._rect = QRectF()
+        self._shape: Optional[QPainterPath] = None
+
+        self.setAcceptHoverEvents(True)
+        self.setZValue(2)  # Au-dessus de la polyligne, sous la poignée de déplacement
+        self.setCursor(Qt.SizeAllCursor)
+
+        # Initialement caché
+        self.setVisible(False)
+        self.refresh()
+
+    @classmethod
+    def _dot_pixmap(cls, brush: QBrush) -> QPixmap:
+        """Disque (remplissage brush, bord de PolylineControlPoint) partagé par tous les points"""
+        key = brush.color().rgba()
+        pixmap = cls._pixmaps.get(key)
+        if pixmap is None:
+            scale = cls.PIXMAP_SCALE
+            size = int(2 * (cls.RADIUS + 1) * scale)
+            pixmap = QPixmap(size, size)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.scale(scale, scale)
+            painter.setPen(PolylineControlPoint.border_pen)
+            painter.setBrush(brush)
+            painter.drawEllipse(QRectF(1, 1, 2 * cls.RADIUS, 2 * cls.RADIUS))
+            painter.end()
+            cls._pixmaps[key] = pixmap
+        return pixmap
+
+    def _dot_rect(self, index: int) -> QRectF:
+        """Zone d'un disque (bord compris)"""
+        half = self.RADIUS + 1
+        return QRectF(self.polyline_item._xs[index] - half, self.polyline_item._ys[index] - half,
+                      2 * half, 2 * half)
+
+    def dragged_index(self) -> Optional[int]:
+        """Sommet en cours de déplacement (None : aucun)"""
+        return self.drag_handle.point_index if self.drag_handle else None
+
+    def refresh(self):
+        """Recalcule la zone occupée après un changement des sommets, et redessine"""
+        xs, ys = self.polyline_item._xs[1:-1], self.polyline_item._ys[1:-1]
+        if xs:
+            half = max(self.RADIUS + 1, self.PICK_RADIUS)  # Disques et zone de prise (shape)
+            rect = QRectF(min(xs) - half, min(ys) - half,
+                          max(xs) - min(xs) + 2 * half, max(ys) - min(ys) + 2 * half)
+        else:
+            rect = QRectF()
+        if rect != self._rect:
+            self.prepareGeometryChange()
+            self._rect = rect
+        self._shape = None
+        if self.hover_index is not None and not 0 < self.hover_index < len(self.polyline_item._xs) - 1:
+            self.hover_index = None
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def shape(self) -> QPainterPath:
+        """Disques seulement : les clics entre deux points atteignent la polyligne ou l'équipement"""
+        if self._shape is None:
+            path = QPainterPath()
+            xs, ys = self.polyline_item._xs, self.polyline_item._ys
+            for i in range(1, len(xs) - 1):
+                path.addEllipse(QPointF(xs[i], ys[i]), self.PICK_RADIUS, self.PICK_RADIUS)
+            self._shape = path
+        return self._shape
+
+    def paint(self, painter: QPainter, option, widget=None):
+        """Tous les disques en un seul passage, par copie de la pixmap commune"""
+        normal = self._dot_pixmap(PolylineControlPoint.normal_brush)
+        hover = self._dot_pixmap(PolylineControlPoint.hover_brush)
+        source = QRectF(normal.rect())
+        dragged = self.dragged_index()
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for i in range(1, len(self.polyline_item._xs) - 1):
+            if i != dragged:
+                painter.drawPixmap(self._dot_rect(i), hover if i == self.hover_index else normal, source)
+
+    def index_at(self, pos: QPointF) -> Optional[int]:
+        """Sommet intermédiaire le plus proche de pos, à moins de PICK_RADIUS (None : aucun)"""
+        xs, ys = self.polyline_item._xs, self.polyline_item._ys
+        x, y = pos.x(), pos.y()
+        best, best_d2 = None, self.PICK_RADIUS * self.PICK_RADIUS
+        for i in range(1, len(xs) - 1):
+            d2 = (xs[i] - x) * (xs[i] - x) + (ys[i] - y) * (ys[i] - y)
+            if d2 <= best_d2:
+                best, best_d2 = i, d2
+        return best
+
+    def _set_hover_index(self, index: Optional[int]):
+        """Change le point survolé, en ne redessinant que les deux disques concernés"""
+        if index == self.hover_index:
+            return
+        for i in (self.hover_index, index):
+            if i is not None:
+                self.update(self._dot_rect(i))
+        self.hover_index = index
+
+    def hoverMoveEvent(self, event):
+        """Survol d'un point de contrôle"""
+        self._set_hover_index(self.index_at(event.pos()))
+        super().hoverMoveEvent(event)
+
+    def hoverLeaveEvent(self, event):
+        """Fin de survol"""
+        self._set_hover_index(None)
+        super().hoverLeaveEvent(event)
+
+    def mousePressEvent(self, event):
+        """Début du déplacement : poignée créée sur le point cliqué"""
+        index = self.index_at(event.pos()) if event.button() == Qt.LeftButton else None
+        if index is None:
+            event.ignore()  # Le clic passe aux éléments en dessous (polyligne...)
+            return
+
+        handle = PolylineControlPoint(index, self.polyline_item, self.polyline_item)
+        handle.setPos(self.polyline_item._xs[index], self.polyline_item._ys[index])
+        handle.setVisible(True)
+        handle.start_drag()
+        self.drag_handle = handle
+        self.update(self._dot_rect(index))
+        event.accept()
+
+    def mouseMoveEvent(self, event):
+        """Déplacement : transmis à la poignée"""
+        if self.drag_handle:
+            self.drag_handle.drag_to(event.scenePos())
+
+    def mouseReleaseEvent(self, event):
+        """Fin du déplacement : la poignée est retirée, le point est redessiné dans le groupe"""
+        if event.button() == Qt.LeftButton:
+            self.end_drag()
+
+    def end_drag(self):
+        """Termine un éventuel déplacement en cours et retire la poignée"""
+        handle = self.drag_handle
+        if handle is None:
+            return
+        handle.end_drag()
+        self.drag_handle = None
+        if handle.scene():
+            handle.scene().removeItem(handle)
+        else:
+            handle.setParentItem(None)
+        self.refresh()
+
 # =============================================================================
 # FONCTIONS UTILITAIRES
 # =============================================================================
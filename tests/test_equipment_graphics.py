@@ -0,0 +1,81 @@
+"""
+Tests des ports d'équipement (PortGraphicsItem), avec Qt hors écran
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PyQt5.QtCore import QPointF
+from PyQt5.QtWidgets import QApplication, QGraphicsScene, QGraphicsView
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+from flowcad.gui.graphics.equipment_graphics import EquipmentGraphicsItem, PortConnectionStatus, PortGraphicsItem
+
+
+@pytest.fixture
+def scene_ports(monkeypatch):
+    """Trois ports libres dans une scène affichée par une vue, ports connectés cachés"""
+    monkeypatch.setattr(PortGraphicsItem, 'SHOW_CONNECTED_PORTS', False)
+    scene = QGraphicsScene()
+    view = QGraphicsView(scene)
+    ports = [PortGraphicsItem(f"P{i}") for i in range(3)]
+    for port in ports:
+        scene.addItem(port)
+    return view, ports
+
+
+def test_batch_update_defers_port_updates(scene_ports):
+    """Dans un lot, les ports sont seulement notés ; ils sont mis à jour une fois en sortie"""
+    _, ports = scene_ports
+
+    with PortGraphicsItem.batch_update():
+        for port in ports:
+            port.set_connection_status(PortConnectionStatus.CONNECTED)
+        with PortGraphicsItem.batch_update():
+            pass  # Lot imbriqué : rien n'est appliqué en sortie
+
+        assert all(port.isVisible() for port in ports)
+        assert PortGraphicsItem._dirty == set(ports)
+
+    assert not any(port.isVisible() for port in ports)
+    assert PortGraphicsItem._dirty == set()
+    assert not PortGraphicsItem._batching
+
+
+def test_batch_update_restores_viewport_mode(scene_ports, monkeypatch):
+    """Beaucoup de ports : toute la vue est redessinée le temps du lot, puis le mode est rétabli"""
+    view, ports = scene_ports
+    monkeypatch.setattr(PortGraphicsItem, 'FULL_VIEWPORT_THRESHOLD', len(ports) - 1)
+    view.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+
+    with PortGraphicsItem.batch_update():
+        assert view.viewportUpdateMode() == QGraphicsView.FullViewportUpdate
+        assert view.scene().signalsBlocked()
+
+    assert view.viewportUpdateMode() == QGraphicsView.SmartViewportUpdate
+    assert not view.scene().signalsBlocked()
+
+
+def test_moving_equipment_updates_connected_polylines(scene_ports):
+    """Déplacer un équipement reporte le mouvement de son port sur la polyligne connectée"""
+    from flowcad.gui.graphics.polyline_graphics import PolylineGraphicsItem
+
+    view, (_, _, end_port) = scene_ports
+    equipment = EquipmentGraphicsItem("E1", {"properties": {}})
+    view.scene().addItem(equipment)
+    start_port = PortGraphicsItem("E1_P", equipment)
+    start_port.setParentItem(equipment)
+    end_port.setPos(40, 30)
+    polyline = PolylineGraphicsItem([QPointF(0, 0), QPointF(40, 0), QPointF(40, 30)], start_port, end_port)
+
+    equipment.setPos(0, 10)
+
+    assert [(p.x(), p.y()) for p in polyline.points] == [(0, 10), (40, 10), (40, 30)]
@@ -0,0 +1,75 @@
+"""
+Tests de la réécriture des styles de tuyaux dans un SVG brut (PipeStyleManager)
+"""
+
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flowcad.gui.graphics.pipe_style_manager import PipeStyleManager, scaled_stroke_width
+
+SVG_NS = 'xmlns="http://www.w3.org/2000/svg"'
+
+
+def _pipe_styles(svg_bytes: bytes) -> dict:
+    """Attributs de style de chaque élément Pipe (le SVG doit rester analysable)"""
+    root = ET.fromstring(svg_bytes)
+    return {element.get('id'): {attr: element.get(attr) for attr in PipeStyleManager.STYLE_ATTRIBUTES}
+            for element in root.iter() if (element.get('id') or '')[:4].lower() == 'pipe'}
+
+
+def _expected(manager: PipeStyleManager, state: str, scale: float) -> dict:
+    style = manager.get_scaled_pipe_style(state, scale)
+    return {attr: style.get(attr) for attr in PipeStyleManager.STYLE_ATTRIBUTES}
+
+
+def test_spaces_around_equal_sign():
+    """Un attribut écrit 'stroke = "red"' est remplacé, pas dupliqué"""
+    manager = PipeStyleManager()
+    svg = f'<svg {SVG_NS}><path id="pipe1" stroke = "red" stroke-width=\'9\'/></svg>'.encode()
+
+    result = manager.modify_svg_pipe_elements(svg, 'selected', 2.0)
+
+    assert _pipe_styles(result) == {'pipe1': _expected(manager, 'selected', 2.0)}
+
+
+def test_unrecognized_pipe_tag_falls_back_to_tree():
+    """Une balise Pipe non reconnue par le chemin rapide : tout le SVG passe par l'arbre"""
+    manager = PipeStyleManager()
+    svg = (f'<svg {SVG_NS}><path id="pipe1" stroke="red"/>'
+           f'<path data-x="a>b" id="pipe2" stroke="red"/></svg>').encode()
+    static_items, stroke_width = manager.get_scaled_style_parts('hover', 0.5)
+
+    assert manager._fast_modify(svg, static_items, stroke_width) is None
+
+    result = manager.modify_svg_pipe_elements(svg, 'hover', 0.5)
+    expected = _expected(manager, 'hover', 0.5)
+    assert _pipe_styles(result) == {'pipe1': expected, 'pipe2': expected}
+
+
+def test_fast_path_matches_tree_path():
+    """Le chemin rapide donne les mêmes attributs que l'arbre"""
+    manager = PipeStyleManager()
+    svg = (f'<svg {SVG_NS}><g id="Pipe_group"><path id="Pipe2" fill="#000"/></g>'
+           f'<circle id="Port1" cx="1" cy="1"/><path id="other" stroke="red"/></svg>').encode()
+
+    result = manager.modify_svg_pipe_elements(svg, 'normal', 1.0)
+    expected = _expected(manager, 'normal', 1.0)
+
+    assert _pipe_styles(result) == {'Pipe_group': expected, 'Pipe2': expected}
+    assert ET.fromstring(result).find('.//*[@id="other"]').get('stroke') == 'red'
+
+
+def test_scaled_stroke_width_rule():
+    """Épaisseur divisée par l'échelle, au plus x3 sous l'échelle 1, jamais sous 0.5"""
+    assert scaled_stroke_width(4.0, 2.0) == 2.0
+    assert scaled_stroke_width(4.0, 0.1) == 12.0
+    assert scaled_stroke_width(4.0, 10.0) == 0.5
+    assert scaled_stroke_width(4.0, 0) == 4.0
+    assert PipeStyleManager()._scaled_stroke_width('normal', 0.5) == f"{scaled_stroke_width(4.0, 0.5):.2f}"
@@ -0,0 +1,140 @@
+"""
+Tests des polylignes de connexion (PolylineGraphicsItem), avec Qt hors écran
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PyQt5.QtCore import QEvent, QPointF, QRectF, Qt
+from PyQt5.QtGui import QMouseEvent, QPainterPathStroker
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication, QGraphicsScene, QGraphicsView
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+from flowcad.gui.graphics.equipment_graphics import PortGraphicsItem
+from flowcad.gui.graphics.polyline_graphics import MOVE_THRESHOLD, PolylineControlPoint, PolylineGraphicsItem
+
+
+def _polyline(*coords) -> PolylineGraphicsItem:
+    return PolylineGraphicsItem([QPointF(x, y) for x, y in coords])
+
+
+@pytest.mark.parametrize("state", ['normal', 'selected', 'hover'])
+def test_stroke_fits_in_bounding_rect(state):
+    """Le trait dessiné, extrémités comprises, tient dans boundingRect() (sinon il est coupé)"""
+    polyline = _polyline((0, 0), (10, 0), (10, 10))
+    polyline.set_pen_state(state)
+
+    stroke = QPainterPathStroker(polyline.pen()).createStroke(polyline.path())
+
+    assert polyline.boundingRect().contains(stroke.boundingRect())
+
+
+def test_build_path_follows_points():
+    """Le chemin construit par copie en bloc (QPolygonF) a un élément par sommet, dans l'ordre"""
+    coords = [(0, 0), (10.5, 0), (10.5, -20.25), (40, -20.25)]
+    polyline = _polyline(*coords)
+
+    path = polyline.path()
+
+    assert path.elementCount() == len(coords)
+    assert path.elementAt(0).isMoveTo()
+    assert all(path.elementAt(i).isLineTo() for i in range(1, len(coords)))
+    assert [(path.elementAt(i).x, path.elementAt(i).y) for i in range(len(coords))] == coords
+    assert [(p.x(), p.y()) for p in polyline.points] == coords
+
+
+def test_control_points_geometry_follows_middle_vertices():
+    """Le groupe de points de contrôle couvre les sommets intermédiaires seulement"""
+    polyline = _polyline((0, 0), (10, 0), (10, 30), (50, 30))
+    group = polyline.control_points_item
+    half = max(group.RADIUS + 1, group.PICK_RADIUS)
+
+    assert group.boundingRect() == QRectF(10 - half, 0 - half, 2 * half, 30 + 2 * half)
+
+    polyline.set_point(2, QPointF(20, 30))
+
+    assert group.boundingRect() == QRectF(10 - half, 0 - half, 10 + 2 * half, 30 + 2 * half)
+    assert group.shape().contains(QPointF(20, 30))
+    assert not group.shape().contains(QPointF(0, 0))
+
+
+def test_index_at_picks_middle_vertices():
+    """Seuls les sommets intermédiaires sont pris, à moins de PICK_RADIUS"""
+    polyline = _polyline((0, 0), (10, 0), (10, 30), (50, 30))
+    group = polyline.control_points_item
+
+    assert group.index_at(QPointF(12, 2)) == 1
+    assert group.index_at(QPointF(10, 27)) == 2
+    assert group.index_at(QPointF(0, 0)) is None       # Extrémité : reliée au port
+    assert group.index_at(QPointF(10, 15)) is None     # Entre deux points
+
+
+def _drag(view: QGraphicsView, start: QPointF, end: QPointF):
+    """Glisser-déposer à la souris, positions en coordonnées de scène"""
+    viewport = view.viewport()
+    QTest.mousePress(viewport, Qt.LeftButton, Qt.NoModifier, view.mapFromScene(start))
+    # QTest.mouseMove n'envoie pas le bouton enfoncé (Qt 5) : événement construit à la main
+    QApplication.sendEvent(viewport, QMouseEvent(QEvent.MouseMove, QPointF(view.mapFromScene(end)),
+                                                 Qt.NoButton, Qt.LeftButton, Qt.NoModifier))
+    QTest.mouseRelease(viewport, Qt.LeftButton, Qt.NoModifier, view.mapFromScene(end))
+
+
+def test_drag_middle_vertex():
+    """Clic, déplacement et relâchement sur un point intermédiaire : sommet et chemin suivent"""
+    scene = QGraphicsScene(-100, -100, 200, 200)
+    view = QGraphicsView(scene)
+    view.resize(300, 300)
+    view.show()
+    polyline = _polyline((0, 0), (10, 0), (10, 30), (50, 30))
+    scene.addItem(polyline)
+    group = polyline.control_points_item
+    group.setVisible(True)
+
+    # Mouvement surtout horizontal : le sommet garde le Y du point précédent
+    _drag(view, QPointF(10, 1), QPointF(25, 3))
+
+    expected = [(0, 0), (25, 0), (10, 30), (50, 30)]
+    assert [(p.x(), p.y()) for p in polyline.points] == expected
+    path = polyline.path()
+    assert [(path.elementAt(i).x, path.elementAt(i).y) for i in range(path.elementCount())] == expected
+
+    # Poignée retirée, point redessiné par le groupe à sa nouvelle place
+    assert group.dragged_index() is None
+    assert group.drag_handle is None
+    assert not any(isinstance(item, PolylineControlPoint) for item in scene.items())
+    assert group.index_at(QPointF(25, 0)) == 1
+    assert group.boundingRect().contains(QPointF(25, 0))
+
+
+def test_endpoint_moves_use_one_threshold():
+    """has_moved_significantly, update_connection_points et update_all : même seuil de déplacement"""
+    scene = QGraphicsScene()
+    start_port, end_port = PortGraphicsItem("A"), PortGraphicsItem("B")
+    end_port.setPos(40, 30)
+    scene.addItem(start_port)
+    scene.addItem(end_port)
+    polylines = [PolylineGraphicsItem([QPointF(0, 0), QPointF(40, 0), QPointF(40, 30)],
+                                      start_port, end_port, register=False) for _ in range(2)]
+    single, grouped = polylines
+
+    assert not single.has_moved_significantly(QPointF(0, 0), QPointF(MOVE_THRESHOLD, -MOVE_THRESHOLD))
+    assert single.has_moved_significantly(QPointF(0, 0), QPointF(0, MOVE_THRESHOLD + 0.5))
+
+    start_port.setPos(0, MOVE_THRESHOLD)  # Pas au-delà du seuil : rien ne bouge
+    single.update_connection_points()
+    PolylineGraphicsItem.update_all([grouped])
+    assert all((p._xs[0], p._ys[0]) == (0, 0) for p in polylines)
+
+    start_port.setPos(0, 5)
+    single.update_connection_points()
+    PolylineGraphicsItem.update_all([grouped])
+    assert all((p._xs[0], p._ys[0]) == (0, 5) for p in polylines)